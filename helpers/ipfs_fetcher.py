@@ -0,0 +1,421 @@
+import asyncio
+import os
+import threading
+import time
+import typing as tp
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from helpers.logger import Logger
+
+load_dotenv()
+IPFS_ENDPOINT = os.getenv("IPFS_ENDPOINT")
+IPFS_GATEWAYS = [
+    gateway.strip().rstrip("/")
+    for gateway in (os.getenv("IPFS_GATEWAYS") or "https://gateway.pinata.cloud,https://ipfs.io").split(",")
+    if gateway.strip()
+]
+IPFS_LOCAL_TIMEOUT = float(os.getenv("IPFS_LOCAL_TIMEOUT") or 5)
+IPFS_HEDGE_DELAY = float(os.getenv("IPFS_HEDGE_DELAY") or 2)
+IPFS_FETCH_WORKERS = int(os.getenv("IPFS_FETCH_WORKERS") or 32)
+GATEWAY_TIMEOUT = float(os.getenv("GATEWAY_TIMEOUT") or 60)
+GATEWAY_MAX_CONNECTIONS_PER_HOST = int(os.getenv("GATEWAY_MAX_CONNECTIONS_PER_HOST") or 4)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+EWMA_ALPHA = 0.2
+
+
+def multiaddr_to_url(multiaddr: tp.Optional[str]) -> tp.Optional[str]:
+    """Converts the IPFS API multiaddr, e.g. `/ip4/127.0.0.1/tcp/5001/http`, to the HTTP URL.
+
+    :return: URL of the API or None if the multiaddr is not set or not supported
+    """
+    if not multiaddr:
+        return None
+    if multiaddr.startswith(("http://", "https://")):
+        return multiaddr.rstrip("/")
+    parts = multiaddr.strip("/").split("/")
+    if len(parts) < 4 or parts[0] not in ("ip4", "ip6", "dns", "dns4", "dns6") or parts[2] != "tcp":
+        return None
+    host = f"[{parts[1]}]" if parts[0] == "ip6" else parts[1]
+    scheme = "https" if "https" in parts[4:] else "http"
+    return f"{scheme}://{host}:{parts[3]}"
+
+
+class GatewayStats:
+    """EWMA of the response latency and of the error rate per gateway.
+    Gateways are tried in the order of the expected time to get a successful response.
+    """
+
+    def __init__(self, default_latency: float = IPFS_HEDGE_DELAY, alpha: float = EWMA_ALPHA) -> None:
+        self._default_latency = default_latency
+        self._alpha = alpha
+        self._lock = threading.Lock()
+        self._stats: tp.Dict[str, tp.Dict[str, float]] = {}
+
+    def record(self, source: str, latency: tp.Optional[float], error: bool) -> None:
+        """
+        :param source: Gateway URL or `local`
+        :param latency: Seconds to the response headers or None if there was no response
+        :param error: Whether the attempt failed
+        """
+        with self._lock:
+            stats = self._stats.setdefault(source, {"latency": None, "errors": 0.0, "requests": 0, "failures": 0})
+            stats["requests"] += 1
+            stats["failures"] += int(error)
+            stats["errors"] += self._alpha * (float(error) - stats["errors"])
+            if latency is not None:
+                if stats["latency"] is None:
+                    stats["latency"] = latency
+                else:
+                    stats["latency"] += self._alpha * (latency - stats["latency"])
+
+    def order(self, gateways: tp.List[str]) -> tp.List[str]:
+        """Sorts the gateways by the expected time to a successful response. Unknown gateways keep the configured order."""
+        with self._lock:
+            return sorted(gateways, key=self._score)
+
+    def snapshot(self) -> tp.Dict[str, tp.Dict[str, float]]:
+        with self._lock:
+            return {source: dict(stats) for source, stats in self._stats.items()}
+
+    def _score(self, gateway: str) -> float:
+        stats = self._stats.get(gateway)
+        if stats is None:
+            return self._default_latency
+        latency = stats["latency"] if stats["latency"] is not None else self._default_latency
+        return latency / max(1 - stats["errors"], 0.05)
+
+
+_gateway_stats = GatewayStats()
+
+
+class _Race:
+    """Shared state of the hedged attempts of one download. The first attempt with the response headers
+    claims the race and streams the body, the later ones close their responses unread.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._winner: tp.Optional[str] = None
+        self.cancelled = threading.Event()
+
+    @property
+    def claimed(self) -> bool:
+        return self._winner is not None
+
+    def claim(self, source: str) -> bool:
+        with self._lock:
+            if self._winner is None:
+                self._winner = source
+            return self._winner == source
+
+    def release(self, source: str) -> None:
+        """Lets the other attempts win after the body transfer of the winner failed."""
+        with self._lock:
+            if self._winner == source:
+                self._winner = None
+
+
+class IPFSFetcher:
+    """Tiered IPFS downloads: the local node first, then hedged requests to the public gateways.
+    The local node is asked with `offline=true`, so it answers at once with the content it already has.
+    On a miss the best gateway is requested; every `hedge_delay` seconds without the response headers
+    (or right after a failure) the next gateway joins the race. The first gateway to answer with 200
+    streams the body, the others close their responses unread, so a big file is downloaded once.
+    """
+
+    def __init__(
+        self,
+        gateways: tp.List[str] = IPFS_GATEWAYS,
+        local_api: tp.Optional[str] = multiaddr_to_url(IPFS_ENDPOINT),
+        hedge_delay: float = IPFS_HEDGE_DELAY,
+        timeout: float = GATEWAY_TIMEOUT,
+        workers: int = IPFS_FETCH_WORKERS,
+    ) -> None:
+        self._gateways = list(gateways)
+        self._local_api = local_api
+        self._hedge_delay = hedge_delay
+        self._timeout = timeout
+        self._logger = Logger("ipfs-fetcher")
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_maxsize=GATEWAY_MAX_CONNECTIONS_PER_HOST))
+        self._session.mount("http://", HTTPAdapter(pool_maxsize=GATEWAY_MAX_CONNECTIONS_PER_HOST))
+        self._host_slots: tp.Dict[str, threading.BoundedSemaphore] = {}
+        self._host_slots_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ipfs-fetch")
+
+    def spool(self, ipfs_path: str, new_file: tp.Callable[[], tp.Any], logger: Logger) -> tp.Optional[tp.Any]:
+        """Streams the content to a file object, e.g. a memory-backed spooled file. Only the attempt that won the race
+        writes to an object from `new_file`, the object of a failed attempt is discarded.
+        :param ipfs_path: Hash or `<hash>/<file name>`
+        :param new_file: Factory of the objects with `write(bytes)` and `discard()`
+
+        :return: File object with the content or None if the file is not found
+        """
+        return self._fetch(ipfs_path, lambda chunks, cancelled: self._write_to(chunks, cancelled, new_file()), logger)
+
+    def stats(self) -> tp.Dict[str, tp.Dict[str, float]]:
+        """Returns latency and error EWMA per source."""
+        return _gateway_stats.snapshot()
+
+    def _fetch(self, ipfs_path: str, sink: tp.Callable, logger: Logger) -> tp.Any:
+        if self._local_api:
+            try:
+                status_code, result = self._attempt("local", "POST", self._local_url(ipfs_path), sink, _Race(), IPFS_LOCAL_TIMEOUT)
+                if status_code == 200:
+                    logger.debug(f"Got {ipfs_path} from the local node")
+                    return result
+            except Exception as e:
+                self._logger.debug(f"Local node couldn't return {ipfs_path}: {e}")
+        return self._race(ipfs_path, sink, logger)
+
+    def _race(self, ipfs_path: str, sink: tp.Callable, logger: Logger) -> tp.Any:
+        gateways = iter(_gateway_stats.order(self._gateways))
+        race = _Race()
+        pending: tp.Set[Future] = set()
+        errors = []
+        not_found = 0
+
+        def launch() -> bool:
+            if race.claimed:
+                return False
+            gateway = next(gateways, None)
+            if gateway is None:
+                return False
+            pending.add(
+                self._executor.submit(self._attempt, gateway, "GET", f"{gateway}/ipfs/{ipfs_path}", sink, race, self._timeout)
+            )
+            return True
+
+        try:
+            while pending or launch():
+                # Once a gateway streams the body there is nothing to hedge, just wait for it.
+                timeout = None if race.claimed else self._hedge_delay
+                done, not_done = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                pending = set(not_done)
+                if not done:
+                    if launch():
+                        logger.debug(f"No response for {ipfs_path} in {self._hedge_delay}s, hedging to the next gateway")
+                    continue
+                for future in done:
+                    try:
+                        status_code, result = future.result()
+                    except Exception as e:
+                        errors.append(str(e))
+                        launch()
+                        continue
+                    if status_code == 200:
+                        return result
+                    # A gateway may not have the content yet, the file is not found only if no gateway has it.
+                    if status_code == 404:
+                        not_found += 1
+                    elif status_code != 499:
+                        errors.append(f"status {status_code}")
+                    launch()
+            if not_found and not errors:
+                logger.debug(f"File {ipfs_path} not found on {not_found} gateways")
+                return None
+            logger.error(f"Couldn't download {ipfs_path} from IPFS gateways: {errors}, not found on {not_found}")
+            raise Exception(f"Couldn't download {ipfs_path} from IPFS gateways")
+        finally:
+            race.cancelled.set()
+
+    def _attempt(self, source: str, method: str, url: str, sink: tp.Callable, race: _Race, timeout: float) -> tp.Tuple[int, tp.Any]:
+        """Requests the content and streams it to the sink if the attempt is the first to get the response headers.
+        Latency is measured to the headers, so it doesn't depend on the file size.
+
+        :return: Status code and the result of the sink, 499 if another attempt won the race
+        """
+        started = time.monotonic()
+        latency = None
+        claimed = False
+        try:
+            with self._slots(url):
+                with self._session.request(method, url, timeout=timeout, stream=True) as response:
+                    latency = time.monotonic() - started
+                    if response.status_code != 200:
+                        if source != "local":
+                            _gateway_stats.record(source, latency, response.status_code != 404)
+                        return response.status_code, None
+                    if not race.claim(source):
+                        _gateway_stats.record(source, latency, False)
+                        return 499, None
+                    claimed = True
+                    result = sink(response.iter_content(DOWNLOAD_CHUNK_SIZE), race.cancelled)
+        except Exception:
+            if claimed:
+                race.release(source)
+            if not race.cancelled.is_set():
+                _gateway_stats.record(source, latency, True)
+            raise
+        if result is None and race.cancelled.is_set():
+            return 499, None
+        _gateway_stats.record(source, latency, False)
+        return 200, result
+
+    def _slots(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._host_slots_lock:
+            return self._host_slots.setdefault(host, threading.BoundedSemaphore(GATEWAY_MAX_CONNECTIONS_PER_HOST))
+
+    def _local_url(self, ipfs_path: str) -> str:
+        return f"{self._local_api}/api/v0/cat?arg={ipfs_path}&offline=true"
+
+    @staticmethod
+    def _write_to(chunks: tp.Iterable[bytes], cancelled: threading.Event, file: tp.Any) -> tp.Optional[tp.Any]:
+        try:
+            for chunk in chunks:
+                if cancelled.is_set():
+                    break
+                file.write(chunk)
+            else:
+                return file
+        except BaseException:
+            file.discard()
+            raise
+        file.discard()
+        return None
+
+
+class AsyncIPFSFetcher:
+    """Async counterpart of the IPFSFetcher. Losing attempts are cancelled as soon as the race is won."""
+
+    def __init__(
+        self,
+        gateways: tp.List[str] = IPFS_GATEWAYS,
+        local_api: tp.Optional[str] = multiaddr_to_url(IPFS_ENDPOINT),
+        hedge_delay: float = IPFS_HEDGE_DELAY,
+        timeout: float = GATEWAY_TIMEOUT,
+    ) -> None:
+        self._gateways = list(gateways)
+        self._local_api = local_api
+        self._hedge_delay = hedge_delay
+        self._timeout = timeout
+        self._logger = Logger("ipfs-fetcher")
+        self._client = httpx.AsyncClient(timeout=timeout, follow_redirects=True)
+        self._host_slots: tp.Dict[str, asyncio.Semaphore] = {}
+
+    async def spool(self, ipfs_path: str, new_file: tp.Callable[[], tp.Any], logger: Logger) -> tp.Optional[tp.Any]:
+        """Streams the content to a file object from `new_file`, like `IPFSFetcher.spool`.
+
+        :return: File object with the content or None if the file is not found
+        """
+
+        async def sink(chunks) -> tp.Any:
+            return await self._write_to(chunks, new_file())
+
+        return await self._fetch(ipfs_path, sink, logger)
+
+    def stats(self) -> tp.Dict[str, tp.Dict[str, float]]:
+        return _gateway_stats.snapshot()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def _fetch(self, ipfs_path: str, sink: tp.Callable, logger: Logger) -> tp.Any:
+        if self._local_api:
+            try:
+                status_code, result = await self._attempt(
+                    "local", "POST", f"{self._local_api}/api/v0/cat?arg={ipfs_path}&offline=true", sink, _Race(), IPFS_LOCAL_TIMEOUT
+                )
+                if status_code == 200:
+                    logger.debug(f"Got {ipfs_path} from the local node")
+                    return result
+            except Exception as e:
+                self._logger.debug(f"Local node couldn't return {ipfs_path}: {e}")
+        return await self._race(ipfs_path, sink, logger)
+
+    async def _race(self, ipfs_path: str, sink: tp.Callable, logger: Logger) -> tp.Any:
+        gateways = iter(_gateway_stats.order(self._gateways))
+        race = _Race()
+        pending: tp.Set[asyncio.Task] = set()
+        errors = []
+        not_found = 0
+
+        def launch() -> bool:
+            if race.claimed:
+                return False
+            gateway = next(gateways, None)
+            if gateway is None:
+                return False
+            pending.add(
+                asyncio.create_task(self._attempt(gateway, "GET", f"{gateway}/ipfs/{ipfs_path}", sink, race, self._timeout))
+            )
+            return True
+
+        try:
+            while pending or launch():
+                timeout = None if race.claimed else self._hedge_delay
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if launch():
+                        logger.debug(f"No response for {ipfs_path} in {self._hedge_delay}s, hedging to the next gateway")
+                    continue
+                for task in done:
+                    try:
+                        status_code, result = task.result()
+                    except Exception as e:
+                        errors.append(str(e))
+                        launch()
+                        continue
+                    if status_code == 200:
+                        return result
+                    if status_code == 404:
+                        not_found += 1
+                    elif status_code != 499:
+                        errors.append(f"status {status_code}")
+                    launch()
+            if not_found and not errors:
+                logger.debug(f"File {ipfs_path} not found on {not_found} gateways")
+                return None
+            logger.error(f"Couldn't download {ipfs_path} from IPFS gateways: {errors}, not found on {not_found}")
+            raise Exception(f"Couldn't download {ipfs_path} from IPFS gateways")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, source: str, method: str, url: str, sink: tp.Callable, race: _Race, timeout: float) -> tp.Tuple[int, tp.Any]:
+        started = time.monotonic()
+        latency = None
+        claimed = False
+        host = urlparse(url).netloc
+        slots = self._host_slots.setdefault(host, asyncio.Semaphore(GATEWAY_MAX_CONNECTIONS_PER_HOST))
+        try:
+            async with slots:
+                async with self._client.stream(method, url, timeout=timeout) as response:
+                    latency = time.monotonic() - started
+                    if response.status_code != 200:
+                        if source != "local":
+                            _gateway_stats.record(source, latency, response.status_code != 404)
+                        return response.status_code, None
+                    if not race.claim(source):
+                        _gateway_stats.record(source, latency, False)
+                        return 499, None
+                    claimed = True
+                    result = await sink(response.aiter_bytes(DOWNLOAD_CHUNK_SIZE))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if claimed:
+                race.release(source)
+            _gateway_stats.record(source, latency, True)
+            raise
+        _gateway_stats.record(source, latency, False)
+        return 200, result
+
+    @staticmethod
+    async def _write_to(chunks: tp.AsyncIterator[bytes], file: tp.Any) -> tp.Any:
+        completed = False
+        try:
+            async for chunk in chunks:
+                file.write(chunk)
+            completed = True
+            return file
+        finally:
+            if not completed:
+                file.discard()
@@ -1,10 +1,12 @@
 import os
 import typing as tp
 import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
 
 from dotenv import load_dotenv
 
 from helpers.logger import Logger
+from helpers.odoo_pool import OdooConnectionPool
 
 load_dotenv()
 
@@ -12,17 +14,22 @@ ODOO_URL = os.getenv("ODOO_URL")
 ODOO_DB = os.getenv("ODOO_DB")
 ODOO_USER = os.getenv("ODOO_USER")
 ODOO_PASSWORD = os.getenv("ODOO_PASSWORD")
+ODOO_POOL_SIZE = int(os.getenv("ODOO_POOL_SIZE") or 4)
+ODOO_POOL_TIMEOUT = float(os.getenv("ODOO_POOL_TIMEOUT") or 30)
 
 
 class OdooHelper:
-    def __init__(self, name_of_the_user: str) -> None:
+    def __init__(self, name_of_the_user: str, pool_size: int = ODOO_POOL_SIZE) -> None:
         self._logger = Logger(f"odoo-helper-{name_of_the_user}")
-        self._connection, self._uid = self._connect_to_db()
+        self._pool, self._uid = self._connect_to_db(pool_size)
+        self._batch_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix=f"odoo-{name_of_the_user}")
 
-    def _connect_to_db(self):
+    def _connect_to_db(self, pool_size: int):
         """Connect to Odoo db
 
-        :return: Proxy to the object endpoint to call methods of the odoo models.
+        :param pool_size: Max number of persistent connections to the object endpoint.
+
+        :return: Pool of proxies to the object endpoint to call methods of the odoo models.
         """
         try:
             common = xmlrpc.client.ServerProxy("{}/xmlrpc/2/common".format(ODOO_URL), allow_none=1)
@@ -31,11 +38,28 @@ class OdooHelper:
                 raise Exception("Credentials are wrong for remote system access")
             else:
                 self._logger.debug("Connection Stablished Successfully")
-                connection = xmlrpc.client.ServerProxy("{}/xmlrpc/2/object".format(ODOO_URL))
-                return connection, uid
+                pool = OdooConnectionPool(
+                    "{}/xmlrpc/2/object".format(ODOO_URL), size=pool_size, timeout=ODOO_POOL_TIMEOUT
+                )
+                return pool, uid
         except Exception as e:
             self._logger.error(f"Couldn't connect to the db: {e}")
 
+    def _execute_kw(self, model: str, method: str, *args):
+        """Calls the method of the model through a connection checked out from the pool.
+        :param model: Name of the model in Odoo
+        :param method: Name of the method to call
+        :param args: Positional and keyword arguments as expected by `execute_kw`
+
+        :return: Result of the call
+        """
+        with self._pool.connection() as connection:
+            return connection.execute_kw(ODOO_DB, self._uid, ODOO_PASSWORD, model, method, *args)
+
+    def pool_stats(self) -> dict:
+        """Returns the connection pool usage: size, connections in use, wait time and connection reuse counts."""
+        return self._pool.stats()
+
     def create(self, model: str, data: dict) -> tp.Optional[int]:
         """Method to create a new record in any Odoo table
         :param model: Name of the model in Odoo
@@ -44,19 +68,28 @@ class OdooHelper:
         :return: Id of the new record
         """
         try:
-            record_id = self._connection.execute_kw(
-                ODOO_DB,
-                self._uid,
-                ODOO_PASSWORD,
-                model,
-                "create",
-                [data],
-            )
+            record_id = self._execute_kw(model, "create", [data])
             return record_id
         except Exception as e:
             self._logger.error(f"Couldn't create a new record in {model}: {e}")
             return None
 
+    def create_many(self, model: str, data_list: tp.List[dict]) -> tp.Optional[tp.List[int]]:
+        """Method to create several records in any Odoo table with one call
+        :param model: Name of the model in Odoo
+        :param data_list: List of dicts to create records with
+
+        :return: Ids of the new records in the same order as in data_list
+        """
+        if not data_list:
+            return []
+        try:
+            record_ids = self._execute_kw(model, "create", [data_list])
+            return record_ids
+        except Exception as e:
+            self._logger.error(f"Couldn't create {len(data_list)} new records in {model}: {e}")
+            return None
+
     def update(self, model: str, record_id: int, data: dict) -> bool:
         """Method to update the exhisting record. with the new data
         :param model: Name of the model in Odoo
@@ -65,14 +98,19 @@ class OdooHelper:
 
         :return: True if updated successfuly, False otherwise
         """
-        return self._connection.execute_kw(
-            ODOO_DB,
-            self._uid,
-            ODOO_PASSWORD,
-            model,
-            "write",
-            [[record_id], data],
-        )
+        return self._execute_kw(model, "write", [[record_id], data])
+
+    def update_many(self, model: str, record_ids: list, data: dict) -> bool:
+        """Method to write the same data to several records with one call
+        :param model: Name of the model in Odoo
+        :param record_ids: Ids of the records to be updated.
+        :param data: Data to write
+
+        :return: True if updated successfuly, False otherwise
+        """
+        if not record_ids:
+            return True
+        return self._execute_kw(model, "write", [list(record_ids), data])
 
     def search(self, model: str, search_domains: list = []) -> list:
         """Looking for a record in the model with the specified domain.
@@ -82,7 +120,7 @@ class OdooHelper:
 
         :return: List of record ids. If there  are no records matching the domain, returns an empty list.
         """
-        ids = self._connection.execute_kw(ODOO_DB, self._uid, ODOO_PASSWORD, model, "search", [search_domains])
+        ids = self._execute_kw(model, "search", [search_domains])
         return ids
 
     def read(self, model: str, record_ids: list, fields: list = []) -> list:
@@ -94,17 +132,29 @@ class OdooHelper:
         :return: List of the records
         """
 
-        data = self._connection.execute_kw(
-                ODOO_DB,
-                self._uid,
-                ODOO_PASSWORD,
-                model,
-                "read",
-                record_ids,
-                {"fields": fields},
-            )
+        data = self._execute_kw(model, "read", record_ids, {"fields": fields})
         return data
 
+    def search_read(
+        self, model: str, search_domains: list = [], fields: list = [], limit: tp.Optional[int] = None, order: tp.Optional[str] = None
+    ) -> list:
+        """Looking for records in the model with the specified domain and fetching their details with one call.
+        :param model: Name of the model in Odoo
+        :param search_domains: Optional: A list of tuples that define the search criteria.
+        Retrievs all records of the model if is empty.
+        :param fields: Optional: Read only the fields. If emtpy, returns all fields
+        :param limit: Optional: Max number of records to return
+        :param order: Optional: Sort string, e.g. "id desc"
+
+        :return: List of the records. Every record contains its id.
+        """
+        kwargs = {"fields": fields}
+        if limit:
+            kwargs["limit"] = limit
+        if order:
+            kwargs["order"] = order
+        return self._execute_kw(model, "search_read", [search_domains], kwargs)
+
     def unlink(self, model: str, record_ids: list) -> bool:
         """Method to delete records from the database. 
         :param model: Name of the model in Odoo
@@ -113,7 +163,21 @@ class OdooHelper:
         :return: True if the deletion is successful.
         """
         try: 
-            result = self._connection.execute_kw(ODOO_DB, self._uid, ODOO_PASSWORD, model, "unlink", [record_ids])
+            result = self._execute_kw(model, "unlink", [record_ids])
             return result
         except Exception as e:
-            self._logger.error(f"Couldn't unlink records {record_ids} in model {model}")
\ No newline at end of file
+            self._logger.error(f"Couldn't unlink records {record_ids} in model {model}")
+
+    def batch(self, calls: tp.List[tuple], return_exceptions: bool = False) -> list:
+        """Runs several independent `execute_kw` calls at once over the pooled connections.
+        Odoo has no multicall for the object endpoint, so the calls are sent in parallel
+        and the batch takes about as long as the slowest call.
+        :param calls: List of tuples (model, method, args) or (model, method, args, kwargs)
+        :param return_exceptions: Optional: Return the errors in place of the results instead of raising
+
+        :return: List of the results in the same order as the calls. Raises the first error if any call failed.
+        """
+        futures = [self._batch_executor.submit(self._execute_kw, *call) for call in calls]
+        if not return_exceptions:
+            return [future.result() for future in futures]
+        return [future.exception() or future.result() for future in futures]
@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+import typing as tp
+import xmlrpc.client
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+class _CountingTransportMixin:
+    """Keeps track of how many HTTP connections the transport opens and reuses.
+    ``xmlrpc.client.Transport`` already keeps the last connection alive (HTTP/1.1),
+    so a transport owned by one thread at a time gives a persistent connection.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.opened = 0
+        self.reused = 0
+
+    def make_connection(self, host):
+        if self._connection and host == self._connection[0] and self._connection[1].sock is not None:
+            self.reused += 1
+        else:
+            self.opened += 1
+        return super().make_connection(host)
+
+
+class _CountingTransport(_CountingTransportMixin, xmlrpc.client.Transport):
+    pass
+
+
+class _CountingSafeTransport(_CountingTransportMixin, xmlrpc.client.SafeTransport):
+    pass
+
+
+class OdooConnectionPool:
+    """Bounded pool of keep-alive XML-RPC proxies. ``ServerProxy`` is not thread-safe,
+    so every call checks out a proxy of its own and returns it back to the pool after the call.
+    """
+
+    def __init__(self, url: str, size: int = 4, timeout: tp.Optional[float] = None) -> None:
+        """
+        :param url: Full url of the xmlrpc endpoint, e.g. ``{ODOO_URL}/xmlrpc/2/object``
+        :param size: Max number of persistent connections
+        :param timeout: Optional: Max seconds to wait for a free connection. Waits forever if None.
+        """
+        self._url = url
+        self._size = max(1, int(size))
+        self._timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=self._size)
+        self._transports: tp.List[_CountingTransportMixin] = []
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @contextmanager
+    def connection(self) -> tp.Iterator[xmlrpc.client.ServerProxy]:
+        """Checks out a proxy for the time of the ``with`` block."""
+        proxy = self._acquire()
+        try:
+            yield proxy
+        except Exception:
+            # The connection may be left in the middle of a response, don't reuse it.
+            proxy("close")()
+            raise
+        finally:
+            self._release(proxy)
+
+    def stats(self) -> tp.Dict[str, tp.Union[int, float]]:
+        """Returns pool usage counters.
+
+        :return: Dict with pool size, connections in use, checkouts, wait time and connection reuse counts.
+        """
+        with self._lock:
+            transports = list(self._transports)
+            stats = {
+                "size": self._size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "checkouts": self._checkouts,
+                "total_wait": self._total_wait,
+                "max_wait": self._max_wait,
+            }
+        stats["connections_opened"] = sum(transport.opened for transport in transports)
+        stats["connections_reused"] = sum(transport.reused for transport in transports)
+        return stats
+
+    def close(self) -> None:
+        """Closes all idle connections."""
+        while True:
+            try:
+                proxy = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            proxy("close")()
+            with self._lock:
+                self._created -= 1
+
+    def _acquire(self) -> xmlrpc.client.ServerProxy:
+        start = time.monotonic()
+        try:
+            proxy = self._idle.get_nowait()
+        except queue.Empty:
+            proxy = self._create_if_allowed()
+            if proxy is None:
+                try:
+                    proxy = self._idle.get(timeout=self._timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No free Odoo connection in {self._timeout} seconds")
+        waited = time.monotonic() - start
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return proxy
+
+    def _release(self, proxy: xmlrpc.client.ServerProxy) -> None:
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put_nowait(proxy)
+
+    def _create_if_allowed(self) -> tp.Optional[xmlrpc.client.ServerProxy]:
+        with self._lock:
+            if self._created >= self._size:
+                return None
+            self._created += 1
+        if urlparse(self._url).scheme == "https":
+            transport = _CountingSafeTransport()
+        else:
+            transport = _CountingTransport()
+        with self._lock:
+            self._transports.append(transport)
+        return xmlrpc.client.ServerProxy(self._url, transport=transport)
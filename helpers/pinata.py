@@ -1,59 +1,145 @@
+import asyncio
 import os
+import time
 import typing as tp
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from dotenv import load_dotenv
 from pinatapy import PinataPy
 
+from helpers.ipfs_fetcher import GATEWAY_TIMEOUT, AsyncIPFSFetcher, IPFSFetcher
 from helpers.logger import Logger
+from helpers.rate_limiter import TokenBucket
 
 load_dotenv()
 PINATA_API_KEY = os.getenv("PINATA_API_KEY")
 PINATA_API_SECRET = os.getenv("PINATA_API_SECRET")
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS") or 16)
+PINATA_RATE_LIMIT = float(os.getenv("PINATA_RATE_LIMIT") or 3)
+PINATA_RATE_BURST = float(os.getenv("PINATA_RATE_BURST") or 10)
+PINATA_API_URL = "https://api.pinata.cloud/"
+PINATA_UNPIN_ATTEMPTS = 5
+# Backoff after 429 when Pinata doesn't send Retry-After: 2, 4, 8, 16 seconds.
+PINATA_RETRY_DELAY = 2
+PINATA_MAX_RETRY_DELAY = 60
+
+_fetcher = IPFSFetcher()
+_downloads_executor = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix="downloads")
+# Pinata API limits the requests per account, so all the API calls of the process share one bucket.
+_pinata_bucket = TokenBucket(PINATA_RATE_LIMIT, PINATA_RATE_BURST)
+_pinata_session = requests.Session()
+_pinata_headers = {"pinata_api_key": PINATA_API_KEY, "pinata_secret_api_key": PINATA_API_SECRET}
+_pinata = PinataPy(PINATA_API_KEY, PINATA_API_SECRET)
+
 
 class PinataHelper:
     
     @staticmethod
-    def download_file(hash: str, logger: Logger) -> str:
-        response = requests.get(f"https://ipfs.io/ipfs/{hash}")
-        if response.status_code == 200:
-            return response.text
-        elif response.status_code == 404:
-            pass
-        else:
-            logger.error(f"Couldn't download file {hash} from Pinata with response: {response}")
-            raise Exception("Couldn't download file from Pinata")
+    def spool_files(hashes: tp.Dict[str, str], new_file: tp.Callable[[str], tp.Any], logger: Logger) -> tp.Dict[str, tp.Optional[tp.Any]]:
+        """Streams the files concurrently to the file objects, e.g. memory-backed spooled files, instead of the disk.
+        :param hashes: Dict file name -> IPFS hash of the file
+        :param new_file: Factory of the objects with `write(bytes)` and `discard()`, gets the file name
+
+        :return: Dict file name -> file object with the content or None if the file is not found
+        """
+        futures = {
+            name: _downloads_executor.submit(PinataHelper._spool_file, hash, lambda name=name: new_file(name), logger)
+            for name, hash in hashes.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
 
     @staticmethod
-    def download_file_from_directory(hash: str, file_name: str, logger: Logger) -> str:
-        response = requests.get(f"https://gateway.pinata.cloud/ipfs/{hash}/{file_name}")
-        if response.status_code == 200:
-            return response.text
-        elif response.status_code == 404:
-            pass
-        else:
-            logger.error(f"Couldn't download file {file_name} from directory {hash} from Pinata with response: {response}")
-            raise Exception("Couldn't download logs from Pinata")
+    def spool_files_from_directory(hash: str, file_names: tp.List[str], new_file: tp.Callable[[str], tp.Any], logger: Logger) -> tp.Dict[str, tp.Optional[tp.Any]]:
+        """Streams the files from the IPFS directory concurrently to the file objects, like `spool_files`.
 
+        :return: Dict file name -> file object with the content or None if the file is not found
+        """
+        futures = {
+            name: _downloads_executor.submit(PinataHelper._spool_file, f"{hash}/{name}", lambda name=name: new_file(name), logger)
+            for name in file_names
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+    @staticmethod
+    def _spool_file(ipfs_path: str, new_file: tp.Callable[[], tp.Any], logger: Logger) -> tp.Optional[tp.Any]:
+        file = _fetcher.spool(ipfs_path, new_file, logger)
+        if file is None:
+            logger.error(f"File {ipfs_path} not found")
+        return file
 
     @staticmethod
-    def unpin_file(hash: str, logger: Logger = None) -> tp.Dict[str, str]:
-        pinata = PinataPy(PINATA_API_KEY, PINATA_API_SECRET)
-        response = pinata.remove_pin_from_ipfs(hash)
-        if response.get("message") == "Removed":
+    def unpin_file(hash: str, logger: Logger = None) -> str:
+        """Unpins the hash from Pinata. Requests are rate limited for the whole process
+        and retried when Pinata answers with 429, after Retry-After or with exponential backoff.
+
+        :return: "unpinned", "not_pinned" or "failed"
+        """
+        for attempt in range(PINATA_UNPIN_ATTEMPTS):
+            _pinata_bucket.acquire()
+            response = _pinata_session.delete(
+                f"{PINATA_API_URL}pinning/unpin/{hash}", headers=_pinata_headers, timeout=GATEWAY_TIMEOUT
+            )
+            if response.status_code != 429 or attempt == PINATA_UNPIN_ATTEMPTS - 1:
+                break
+            delay = PinataHelper._retry_after(response, PINATA_RETRY_DELAY * 2 ** attempt)
+            if logger:
+                logger.debug(f"Pinata rate limit hit while unpinning {hash}, retrying in {delay} sec")
+            time.sleep(delay)
+        if response.ok:
             if logger:
                 logger.debug(f"Hash {hash} unpinned from Pinata")
-        else:
+            return "unpinned"
+        if response.status_code == 404 or "NOT_PINNED" in response.text:
             if logger:
-                logger.error(f"Couldn't unpin hash: {response}")
+                logger.debug(f"Hash {hash} is not pinned to Pinata")
+            return "not_pinned"
+        if logger:
+            logger.error(f"Couldn't unpin hash: {response.status_code} {response.text}")
+        return "failed"
     
+    @staticmethod
+    def _retry_after(response: requests.Response, default: float) -> float:
+        """Seconds to wait from the Retry-After header or the default if there is no valid one."""
+        try:
+            return max(0.0, min(float(response.headers["Retry-After"]), PINATA_MAX_RETRY_DELAY))
+        except (KeyError, TypeError, ValueError):
+            return default
+
     @staticmethod
     def generate_pinata_keys(key_name: str) -> tp.Dict[str, str]:
-        pinata = PinataPy(PINATA_API_KEY, PINATA_API_SECRET)
-        response = pinata.generate_api_key(
+        _pinata_bucket.acquire()
+        response = _pinata.generate_api_key(
             key_name=key_name,
             is_admin=False,
             options={"permissions": {"endpoints": {"pinning": {"pinFileToIPFS": True, "unpin": True}}}},
         )
         return response
 
+
+class AsyncPinataHelper:
+    """Async counterpart of the PinataHelper spooled downloads. Keeps one HTTP client with keep-alive connections."""
+
+    def __init__(self, timeout: float = GATEWAY_TIMEOUT) -> None:
+        self._fetcher = AsyncIPFSFetcher(timeout=timeout)
+
+    async def spool_files(self, hashes: tp.Dict[str, str], new_file: tp.Callable[[str], tp.Any], logger: Logger) -> tp.Dict[str, tp.Optional[tp.Any]]:
+        files = await asyncio.gather(
+            *(self._spool_file(hash, lambda name=name: new_file(name), logger) for name, hash in hashes.items())
+        )
+        return dict(zip(hashes, files))
+
+    async def spool_files_from_directory(self, hash: str, file_names: tp.List[str], new_file: tp.Callable[[str], tp.Any], logger: Logger) -> tp.Dict[str, tp.Optional[tp.Any]]:
+        files = await asyncio.gather(
+            *(self._spool_file(f"{hash}/{name}", lambda name=name: new_file(name), logger) for name in file_names)
+        )
+        return dict(zip(file_names, files))
+
+    async def _spool_file(self, ipfs_path: str, new_file: tp.Callable[[], tp.Any], logger: Logger) -> tp.Optional[tp.Any]:
+        file = await self._fetcher.spool(ipfs_path, new_file, logger)
+        if file is None:
+            logger.error(f"File {ipfs_path} not found")
+        return file
+
+    async def close(self) -> None:
+        await self._fetcher.close()
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+import typing as tp
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+RRS_USERS_CACHE_TTL = float(os.getenv("RRS_USERS_CACHE_TTL") or 300)
+RRS_USERS_CACHE_SIZE = int(os.getenv("RRS_USERS_CACHE_SIZE") or 1024)
+
+
+class RRSUsersCache:
+    """In-process TTL/LRU cache of `rrs.register` rows shared by the registrar and the operator.
+    Rows are stored by id and can be found by any of the indexed fields.
+    """
+
+    MODEL = "rrs.register"
+    INDEXED_FIELDS = ("address", "customer_email", "revolut_cid", "revolut_order_id")
+    FIELDS = list(INDEXED_FIELDS) + ["paid", "last_paid", "pinata_key", "pinata_secret"]
+
+    _rows: "OrderedDict[int, tp.Tuple[float, dict]]" = OrderedDict()
+    _indexes: tp.Dict[str, tp.Dict[str, int]] = {field: {} for field in INDEXED_FIELDS}
+    _lock = threading.RLock()
+    _hits = 0
+    _misses = 0
+
+    @classmethod
+    def get_or_load(cls, helper, field: str, value: tp.Any) -> tp.Optional[dict]:
+        """Returns the cached row or reads it from Odoo and caches it.
+        :param helper: OdooHelper instance to read the row with
+        :param field: "id" or one of the indexed fields
+        :param value: Value of the field
+
+        :return: The row with all cached fields or None if there is no such user.
+        """
+        if not value:
+            return None
+        row = cls.get(field, value)
+        if row is not None:
+            return row
+        rows = helper.search_read(cls.MODEL, [(field, "=", value)], cls.FIELDS, limit=1)
+        if not rows:
+            return None
+        cls.put(rows[0])
+        return dict(rows[0])
+
+    @classmethod
+    def get(cls, field: str, value: tp.Any) -> tp.Optional[dict]:
+        """Returns a copy of the cached row or None if it is missing or expired."""
+        with cls._lock:
+            if field == "id":
+                record_id = value
+            else:
+                record_id = cls._indexes[field].get(str(value))
+            entry = cls._rows.get(record_id) if record_id is not None else None
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    cls._remove(record_id)
+                cls._misses += 1
+                return None
+            cls._rows.move_to_end(record_id)
+            cls._hits += 1
+            return dict(entry[1])
+
+    @classmethod
+    def put(cls, row: dict) -> None:
+        """Caches the row. The row must contain its id."""
+        with cls._lock:
+            cls._remove(row["id"])
+            cls._rows[row["id"]] = (time.monotonic() + RRS_USERS_CACHE_TTL, dict(row))
+            for field in cls.INDEXED_FIELDS:
+                if row.get(field):
+                    cls._indexes[field][str(row[field])] = row["id"]
+            while len(cls._rows) > RRS_USERS_CACHE_SIZE:
+                cls._remove(next(iter(cls._rows)))
+
+    @classmethod
+    def invalidate(cls, field: str, value: tp.Any) -> None:
+        """Drops the row found by the field. Next lookup reads it from Odoo."""
+        with cls._lock:
+            if field == "id":
+                cls._remove(value)
+            elif value is not None:
+                record_id = cls._indexes[field].get(str(value))
+                if record_id is not None:
+                    cls._remove(record_id)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._rows.clear()
+            for index in cls._indexes.values():
+                index.clear()
+
+    @classmethod
+    def stats(cls) -> tp.Dict[str, int]:
+        with cls._lock:
+            return {"size": len(cls._rows), "hits": cls._hits, "misses": cls._misses}
+
+    @classmethod
+    def _remove(cls, record_id: int) -> None:
+        entry = cls._rows.pop(record_id, None)
+        if entry is None:
+            return
+        for field in cls.INDEXED_FIELDS:
+            value = entry[1].get(field)
+            if value and cls._indexes[field].get(str(value)) == record_id:
+                del cls._indexes[field][str(value)]
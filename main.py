@@ -1,13 +1,14 @@
-from registar.registar import Registar
-from rrs_operator.rrs_operator import Operator
-
-
 def main() -> None:
+    # Imported here, not at the module level: the decryption processes are spawned and import this module again.
+    from registar.registar import Registar
+    from rrs_operator.rrs_operator import Operator
+
     operator = Operator()
     add_user_callback = operator.get_robonomics_add_user_callback()
     unpin_logs_from_IPFS_callback = operator.get_unpin_logs_from_IPFS_callback()
     get_file_from_IPFS_callback = operator.get_file_from_IPFS_callback()
-    registar = Registar(add_user_callback, unpin_logs_from_IPFS_callback, get_file_from_IPFS_callback)
+    ticket_stage_changed_callback = operator.get_ticket_stage_changed_callback()
+    registar = Registar(add_user_callback, unpin_logs_from_IPFS_callback, get_file_from_IPFS_callback, ticket_stage_changed_callback, operator.stop)
 
 
 if __name__ == "__main__":
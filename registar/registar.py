@@ -12,14 +12,16 @@ load_dotenv()
 FLASK_PORT = os.getenv("FLASK_PORT")
 
 class Registar:
-    def __init__(self, add_user_callback, get_unpin_logs_from_IPFS_callback, get_file_from_IPFS_callback) -> None:
+    def __init__(self, add_user_callback, get_unpin_logs_from_IPFS_callback, get_file_from_IPFS_callback, ticket_stage_changed_callback, on_shutdown_callback=None) -> None:
         self.odoo = Odoo()
         self.app = Flask(__name__)
         self.ws = WSClient(self.odoo)
-        BaseView.initialize(add_user_callback, get_unpin_logs_from_IPFS_callback, get_file_from_IPFS_callback, self.odoo)
+        BaseView.initialize(add_user_callback, get_unpin_logs_from_IPFS_callback, get_file_from_IPFS_callback, ticket_stage_changed_callback, self.odoo)
         OdooFlaskView.register(self.app, route_base="/")
         flask_thread = threading.Thread(target=lambda: self.app.run(host="127.0.0.1", port=FLASK_PORT))
         flask_thread.start()
         print(f" 2: ({[rule.rule for rule in self.app.url_map.iter_rules()]})")
         self.ws.run()
+        if on_shutdown_callback:
+            on_shutdown_callback()
         os._exit(0)   
\ No newline at end of file
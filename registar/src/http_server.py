@@ -1,11 +1,13 @@
-from flask import request, Response, jsonify
+from flask import request, Response, jsonify, send_file
 from flask_classful import FlaskView, route
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
 from dotenv import load_dotenv
 import os
 import threading
 import requests
 
 from helpers.logger import Logger
+from helpers.rrs_users_cache import RRSUsersCache
 from registar.utils.odoo_requests import save_cid_and_orderid, save_orderid, update_last_paid, set_status_not_paid, setup_new_paid_customer
 from registar.utils.jwt import jwt_required, generate_token
 
@@ -18,6 +20,8 @@ STATUS_NOTPAID_ID = os.getenv("ODOO_RRS_STATUS_NOTPAID_ID")
 ADMIN_SEED = os.getenv("ADMIN_SEED")
 DONE_SATGE_ID = os.getenv("ODOO_HELPDESK_DONE_STAGE_ID")
 PAYMENT_PROVIDER_URL = os.getenv("PAYMENT_PROVIDER_URL")
+# The logs are private, so they are cached only by the browser of the user.
+LOGS_MAX_AGE = 24 * 60 * 60
 
 
 class BaseView(FlaskView):
@@ -26,12 +30,13 @@ class BaseView(FlaskView):
     _logger = None
 
     @classmethod
-    def initialize(cls, add_user_callback, unpin_logs_from_IPFS_callback, get_file_from_IPFS_callback, odoo):
+    def initialize(cls, add_user_callback, unpin_logs_from_IPFS_callback, get_file_from_IPFS_callback, ticket_stage_changed_callback, odoo):
         cls.set_logger()
         cls.odoo = odoo
         cls.add_user_callback = add_user_callback
         cls.unpin_logs_from_IPFS_callback = unpin_logs_from_IPFS_callback
         cls.get_file_from_IPFS_callback = get_file_from_IPFS_callback
+        cls.ticket_stage_changed_callback = ticket_stage_changed_callback
 
     @classmethod
     def set_logger(cls):
@@ -46,6 +51,7 @@ class OdooFlaskView(BaseView):
         request_data = request.get_json()
         self._logger.debug(f"Data from new-user request: {request_data}")
         address = request_data["address"]
+        RRSUsersCache.invalidate("address", address)
         self.add_user_callback(address)
         return "ok"
 
@@ -53,6 +59,7 @@ class OdooFlaskView(BaseView):
     def ticket_dont_handler(self):
         request_data = request.get_json()
         self._logger.debug(f"Data from ticket-done request: {request_data}")
+        self.ticket_stage_changed_callback(int(request_data["id"]), int(request_data["stage"]))
         if int(request_data["stage"]) == int(DONE_SATGE_ID):
             ticket_id = int(request_data["id"])
             self.unpin_logs_from_IPFS_callback(ticket_id)
@@ -60,11 +67,44 @@ class OdooFlaskView(BaseView):
     
     @route("/odoo/ipfs/<hash>", methods=["GET"])
     def download_logs_handler(self, hash):
-        log_content = self.get_file_from_IPFS_callback(hash)
-        response = Response(log_content)
-        response.headers["Content-Disposition"] = f"attachment; filename={hash}"
-        response.headers["Content-Type"] = "text/plain"
-        return response
+        """Streams the file from the local cache. The content behind a CID never changes,
+        so the CID is a strong ETag. Range requests are supported.
+        """
+        file = self._open_cached_file(hash)
+        if file is None:
+            return Response(status=404)
+        size = os.fstat(file.fileno()).st_size
+        response = send_file(
+            file,
+            mimetype="text/plain",
+            as_attachment=True,
+            download_name=hash,
+            etag=hash,
+            max_age=LOGS_MAX_AGE,
+        )
+        response.content_length = size
+        response.headers["Cache-Control"] = f"private, max-age={LOGS_MAX_AGE}"
+        try:
+            return response.make_conditional(request, accept_ranges=True, complete_length=size)
+        except RequestedRangeNotSatisfiable:
+            file.close()
+            raise
+
+    def _open_cached_file(self, hash):
+        """Opens the file from the local cache. The file can be evicted from the cache between getting
+        its path and opening it, then it is got again. The opened file stays readable after the eviction.
+
+        :return: File object or None if the file couldn't be got
+        """
+        for _ in range(2):
+            path_to_file = self.get_file_from_IPFS_callback(hash)
+            if path_to_file is None:
+                return None
+            try:
+                return open(path_to_file, "rb")
+            except FileNotFoundError:
+                self._logger.debug(f"File {hash} was evicted from the cache, getting it again")
+        return None
 
     @route("/odoo/next-payment/<cid>", methods=["POST"])
     def next_payment_handler(self, cid):
@@ -91,6 +131,7 @@ class OdooFlaskView(BaseView):
         order_id = request_data.get("order_id")
         if not cid or not order_id:
             return jsonify({"error": "Both 'cid' and 'order_id' are required"}), 400
+        RRSUsersCache.invalidate("customer_email", email)
         threading.Thread(target=save_cid_and_orderid, args=(self.odoo,cid, order_id, email,)).start()
         return Response(status=200)
     
@@ -101,6 +142,7 @@ class OdooFlaskView(BaseView):
         order_id = request_data.get("order_id")
         if not order_id:
             return jsonify({"error": "Order_id is required"}), 400
+        RRSUsersCache.invalidate("revolut_cid", cid)
         save_orderid(self.odoo, cid, order_id)
         self._logger.debug("/updateOrderId: order id updated")
         return Response(status=200)
@@ -114,6 +156,7 @@ class OdooFlaskView(BaseView):
         order_id = request_data.get("order_id")
         if not order_id:
             return jsonify({"error": "Order_id is required"}), 400
+        RRSUsersCache.invalidate("revolut_order_id", order_id)
         thread1 = threading.Thread(target=setup_new_paid_customer, args=(self.odoo, order_id,self.unpin_logs_from_IPFS_callback))
         thread1.start()
         thread1.join(timeout=10)
@@ -129,5 +172,6 @@ class OdooFlaskView(BaseView):
         order_id = request_data.get("order_id")
         if not order_id:
             return jsonify({"error": "Order_id is required"}), 400
+        RRSUsersCache.invalidate("revolut_order_id", order_id)
         threading.Thread(target=set_status_not_paid, args=(self.odoo, order_id,)).start()
         return Response(status=200)
@@ -5,6 +5,7 @@ from tenacity import *
 
 from helpers.logger import Logger
 from helpers.odoo import OdooHelper
+from helpers.rrs_users_cache import RRSUsersCache
 
 
 class Odoo:
@@ -34,17 +35,15 @@ class Odoo:
             raise Exception("Failed to create rrs user")
 
     @retry(wait=wait_fixed(5))
-    def check_if_rrs_user_exists(self, sender_address: str) -> tp.Union[int, bool]:
-        """Looking for a rrs user id by the controller address.
+    def find_rrs_user(self, sender_address: str) -> tp.Optional[dict]:
+        """Looking for a rrs user by the controller address.
         :param sender_address: Customer's address in Robonomics parachain.
 
-        :return: The user id or false.
+        :return: Dict with the user id and the `RRSUsersCache.FIELDS` or None.
         """
-        id = self.helper.search("rrs.register", [("address", "=", sender_address)])
-        self._logger.debug(f"Find RRS user with id: {id}")
-        if id:
-            return id[0]
-        return False
+        user_data = RRSUsersCache.get_or_load(self.helper, "address", sender_address)
+        self._logger.debug(f"Find RRS user with id: {user_data and user_data['id']}")
+        return user_data
 
     @retry(wait=wait_fixed(5))
     def update_rrs_user_with_pinata_creds(self, user_id: int, pinata_key: str, pinata_api_secret: str) -> bool:
@@ -55,7 +54,7 @@ class Odoo:
         :return: bool
         """
         try: 
-            return self.helper.update(
+            result = self.helper.update(
                 "rrs.register",
                 user_id,
                 {
@@ -63,40 +62,12 @@ class Odoo:
                     "pinata_secret": pinata_api_secret,
                 },
             )
+            RRSUsersCache.invalidate("id", user_id)
+            return result
         except Exception as e:
             self._logger.error(f"Couldn't update user {user_id} with pinata creds {e}")
             raise Exception("Failed to update the user")
     
-    @retry(wait=wait_fixed(5))
-    def retrieve_pinata_creds(self, sender_address: str, rrs_user_id: int) -> tuple:
-        """Retrieve pinata creds.
-        :param sender_address: Customer's address in Robonomics parachain
-        :param rrs_user_id: User id in RRS module.
-
-        :return: The Pinata creds or None.
-        """
-        try:
-            rrs_user_data = self.helper.read("rrs.register", [rrs_user_id], ["pinata_key", "pinata_secret"])
-            if rrs_user_data:
-                pinata_key = rrs_user_data[0]["pinata_key"]
-                pinata_secret = rrs_user_data[0]["pinata_secret"]
-                self._logger.debug(f"Found pinata creds for address: {sender_address}, pinata key: {pinata_key}")
-                return pinata_key, pinata_secret
-            else:
-                self._logger.error(f"Couldn't find pinata creds for {sender_address}")
-        except Exception as e:
-            self._logger.error(f"Couldn't get pinata creds for user: {sender_address}")
-            raise Exception(f"Couldn't  retrieve pinata creds for {sender_address}")
-        
-    @retry(wait=wait_fixed(5))
-    def is_paid(self, rrs_user_id: int) -> bool:
-        """Check if the customer has paid for the service.
-        :param address: rrs_user_id: User id in RRS module.
-
-        :return: bool
-        """
-        return self.helper.read("rrs.register", [rrs_user_id], ["paid"])[0]["paid"]
-
     @retry(wait=wait_fixed(5))
     def save_cid_and_orderid(self, cid: str, order_id: str, email: str):
         id = self._find_user_by_email(email)
@@ -104,7 +75,7 @@ class Odoo:
             self._logger.error(f"Couldn't user with email: {email}")
             return 
         try: 
-            return self.helper.update(
+            result = self.helper.update(
                 "rrs.register",
                 id[0],
                 {
@@ -112,6 +83,8 @@ class Odoo:
                     "revolut_order_id": order_id,
                 },
             )
+            RRSUsersCache.invalidate("id", id[0])
+            return result
         except Exception as e:
             self._logger.error(f"Couldn't update user {id} with revolut: {e}")
             raise Exception("Failed to update the user")
@@ -124,13 +97,15 @@ class Odoo:
             self._logger.error(f"Couldn't user with cid: {cid}")
             return 
         try: 
-            return self.helper.update(
+            result = self.helper.update(
                 "rrs.register",
                 id[0],
                 {
                     "revolut_order_id": order_id,
                 },
             )
+            RRSUsersCache.invalidate("id", id[0])
+            return result
         except Exception as e:
             self._logger.error(f"Couldn't update user {id} with order_id: {e}")
             raise Exception("Failed to update the user")
@@ -143,7 +118,7 @@ class Odoo:
                 self._logger.error(f"Couldn't user with order_id: {order_id}")
                 return 
         try: 
-            return self.helper.update(
+            result = self.helper.update(
                 "rrs.register",
                 id[0],
                 {
@@ -151,6 +126,8 @@ class Odoo:
                     "last_paid": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 },
             )
+            RRSUsersCache.invalidate("id", id[0])
+            return result
         except Exception as e:
             self._logger.error(f"Couldn't update user {id} with last_paid: {e}")
             raise Exception("Failed to update the user")
@@ -162,13 +139,15 @@ class Odoo:
             self._logger.error(f"Couldn't user with order_id: {order_id}")
             return 
         try: 
-            return self.helper.update(
+            result = self.helper.update(
                 "rrs.register",
                 id[0],
                 {
                     "paid": False
                 },
             )
+            RRSUsersCache.invalidate("id", id[0])
+            return result
         except Exception as e:
             self._logger.error(f"Couldn't update user {id} with status not paid: {e}")
             raise Exception("Failed to update the user")
@@ -189,25 +168,13 @@ class Odoo:
             raise Exception("Failed to get tickets")
 
     @retry(wait=wait_fixed(5))
-    def delete_ticket(self, ticket_id: int):
-        try:
-            self._logger.debug("deleting ticket...")
-            return self.helper.unlink("helpdesk.ticket", [ticket_id])
-        except Exception as e:
-            self._logger.error(f"Couldn't unlink ticket {ticket_id}: {e}")
-            raise Exception("Failed to unlink ticket")
-    
-    @retry(wait=wait_fixed(5))
-    def find_email_from_user_id(self, id: int):
+    def delete_tickets(self, ticket_ids: list):
         try:
-            user_data = self.helper.read(model="rrs.register", record_ids=id, fields=["customer_email"])
-            email = user_data[0]['customer_email']
-            self._logger.debug(f"Find user's email: {email}")
-            return email
+            self._logger.debug(f"deleting tickets {ticket_ids}...")
+            return self.helper.unlink("helpdesk.ticket", [int(ticket_id) for ticket_id in ticket_ids])
         except Exception as e:
-            self._logger.error(f"Couldn't find email for {id}: {e}")
-            raise Exception("Failed to find email")
-        
+            self._logger.error(f"Couldn't unlink tickets {ticket_ids}: {e}")
+            raise Exception("Failed to unlink tickets")
 
     @retry(wait=wait_fixed(5))
     def _find_user_by_email(self, email: str) -> list:
@@ -216,7 +183,8 @@ class Odoo:
 
         :return: The list with user id.
         """
-        id = self.helper.search(model="rrs.register", search_domains=[("customer_email", "=", email)])
+        user_data = RRSUsersCache.get_or_load(self.helper, "customer_email", email)
+        id = [user_data["id"]] if user_data else []
         self._logger.debug(f"Find user with id: {id}")
         return id
     
@@ -227,7 +195,8 @@ class Odoo:
 
         :return: The list with user id.
         """
-        id = self.helper.search(model="rrs.register", search_domains=[("revolut_cid", "=", cid)])
+        user_data = RRSUsersCache.get_or_load(self.helper, "revolut_cid", cid)
+        id = [user_data["id"]] if user_data else []
         self._logger.debug(f"Find user with id: {id}")
         return id
 
@@ -238,6 +207,18 @@ class Odoo:
 
         :return: The list with user id.
         """
-        id = self.helper.search(model="rrs.register", search_domains=[("revolut_order_id", "=", str(order_id))])
+        user_data = RRSUsersCache.get_or_load(self.helper, "revolut_order_id", str(order_id))
+        id = [user_data["id"]] if user_data else []
         self._logger.debug(f"Find user with id: {id}")
-        return id
\ No newline at end of file
+        return id
+
+    @retry(wait=wait_fixed(5))
+    def find_user_data_by_orderid(self, order_id: str) -> tp.Optional[dict]:
+        """Find a user by the Revolut order id.
+        :param order_id: Revolut order id
+
+        :return: Dict with the user id and the `RRSUsersCache.FIELDS` or None.
+        """
+        user_data = RRSUsersCache.get_or_load(self.helper, "revolut_order_id", str(order_id))
+        self._logger.debug(f"Find user with id: {user_data and user_data['id']}")
+        return user_data
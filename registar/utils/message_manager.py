@@ -25,10 +25,10 @@ class MessageManager:
         if "email" in msg:
             sender_address = msg["address"]
             email = self._decrypt_email(msg)
-            rrs_user_id = self.odoo.check_if_rrs_user_exists(sender_address)
-            if rrs_user_id:
-                pinata_key, pinata_secret = self._get_existing_user_credentials(sender_address, rrs_user_id)
-                paid = self.odoo.is_paid(rrs_user_id)
+            rrs_user = self.odoo.find_rrs_user(sender_address)
+            if rrs_user:
+                pinata_key, pinata_secret = self._get_existing_user_credentials(rrs_user)
+                paid = rrs_user["paid"]
             else:
                 user_id = self._create_new_rrs_user(email, sender_address)
                 pinata_key, pinata_secret = self._generate_and_store_pinata_keys(user_id, sender_address)
@@ -41,9 +41,9 @@ class MessageManager:
     def _decrypt_email(self, msg: dict) -> str:
         return decrypt_message(msg["email"], msg["address"], self._logger)
 
-    def _get_existing_user_credentials(self, sender_address, rrs_user_id):
+    def _get_existing_user_credentials(self, rrs_user: dict):
         """Retrieves and sends Pinata credentials for an existing user."""
-        pinata_key, pinata_secret = self.odoo.retrieve_pinata_creds(sender_address, rrs_user_id)
+        pinata_key, pinata_secret = rrs_user["pinata_key"], rrs_user["pinata_secret"]
         self._logger.debug(f"pinata creds: {pinata_key}, {pinata_secret}")
         if pinata_key:
             return pinata_key, pinata_secret
@@ -8,19 +8,13 @@ def save_orderid(odoo, cid: str, order_id):
 def update_last_paid(odoo, order_id: str):
     return odoo.update_last_paid(order_id)
 
-def _is_paid(odoo, order_id):
-    id = odoo.find_user_by_orderid(order_id)
-    return odoo.is_paid(id)
-
 def setup_new_paid_customer(odoo, order_id: str, unpin_logs_from_IPFS_callback):
-    is_paid = _is_paid(odoo, order_id)
-    if not is_paid:
-        id = odoo.find_user_by_orderid(order_id)
-        email = odoo.find_email_from_user_id(id)
-        tickets_ids = odoo.find_tickets_by_email(email)
-        for ticket in tickets_ids:
-            unpin_logs_from_IPFS_callback(ticket)
-            odoo.delete_ticket(int(ticket))
+    user_data = odoo.find_user_data_by_orderid(order_id)
+    if user_data and not user_data["paid"]:
+        tickets_ids = odoo.find_tickets_by_email(user_data["customer_email"])
+        if tickets_ids:
+            unpin_logs_from_IPFS_callback(*tickets_ids)
+            odoo.delete_tickets(tickets_ids)
 
 def set_status_not_paid(odoo, order_id: str):
     return odoo.set_status_not_paid(order_id)
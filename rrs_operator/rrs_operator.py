@@ -1,21 +1,51 @@
+import os
 import threading
+import time
+import typing as tp
 
+from dotenv import load_dotenv
+
+from helpers.logger import Logger
 from rrs_operator.src.odoo import Odoo
 from rrs_operator.src.robonomics import RobonomicsHelper
 from rrs_operator.src.ws_client import WSClient
+from rrs_operator.utils.bulk_unpinner import BulkUnpinner
 from rrs_operator.utils.ipfs_helper import IPFSHelper
+from rrs_operator.utils.occurrences_buffer import OccurrencesBuffer
+from rrs_operator.utils.tickets_index import TicketsIndex
+
+load_dotenv()
+ODOO_HELPDESK_NEW_STAGE_ID = os.getenv("ODOO_HELPDESK_NEW_STAGE_ID")
+ODOO_HELPDESK_INPROGRESS_STAGE_ID = os.getenv("ODOO_HELPDESK_INPROGRESS_STAGE_ID")
+OPERATOR_ASYNC = os.getenv("OPERATOR_ASYNC", "").lower() in ("1", "true", "yes")
+# Seconds between the log lines with the queue, workers and Odoo pool usage, 0 disables them.
+OPERATOR_STATS_INTERVAL = float(os.getenv("OPERATOR_STATS_INTERVAL") or 60)
 
 
 class Operator:
     def __init__(self) -> None:
+        self._logger = Logger("operator")
         self.odoo = Odoo()
+        self.tickets_index = TicketsIndex()
+        self.occurrences = OccurrencesBuffer(self.odoo)
         self.robonomics = RobonomicsHelper(self.odoo)
         # self.robonomics.subscribe()
-        self.ws = WSClient(self.odoo)
+        if OPERATOR_ASYNC:
+            from rrs_operator.src.async_ws_client import AsyncWSClient
+
+            self.ws = AsyncWSClient(self.odoo, self.tickets_index, self.occurrences)
+        else:
+            self.ws = WSClient(self.odoo, self.tickets_index, self.occurrences)
         ws_thread = threading.Thread(target=self.ws.run)
         ws_thread.daemon = True
         ws_thread.start()
+        if OPERATOR_STATS_INTERVAL > 0:
+            threading.Thread(target=self._log_stats, name="operator-stats", daemon=True).start()
     
+    def stop(self) -> None:
+        """Writes the buffered data to Odoo before the process exits."""
+        self.occurrences.stop()
+
     def get_robonomics_add_user_callback(self) -> None:
         return self.robonomics.add_user_callback
 
@@ -25,10 +55,30 @@ class Operator:
     def get_file_from_IPFS_callback(self):
         return self._get_file_from_ipfs
 
-    def _get_and_unpin_hashes_from_ipfs(self, ticket_id: int) -> None:
-        hashes = self.odoo.get_hashes_from_ticket(ticket_id)
-        for hash in hashes:
-            IPFSHelper.unpin_hash(hash)
+    def get_ticket_stage_changed_callback(self):
+        return self._on_ticket_stage_changed
+
+    def _on_ticket_stage_changed(self, ticket_id: int, stage_id: int) -> None:
+        if int(stage_id) not in (int(ODOO_HELPDESK_NEW_STAGE_ID), int(ODOO_HELPDESK_INPROGRESS_STAGE_ID)):
+            self.tickets_index.remove_ticket(ticket_id)
+
+    def _get_and_unpin_hashes_from_ipfs(self, *ticket_ids: int) -> tp.Dict[str, str]:
+        """Unpins the logs of all the tickets from the IPFS node in one batch.
+
+        :return: Dict hash -> "unpinned", "not_pinned" or "failed"
+        """
+        for ticket_id in ticket_ids:
+            self.tickets_index.remove_ticket(ticket_id)
+        hashes = self.odoo.get_hashes_from_tickets(list(ticket_ids))
+        return BulkUnpinner.unpin_local(hashes, self._logger)
+
+    def _log_stats(self) -> None:
+        while True:
+            time.sleep(OPERATOR_STATS_INTERVAL)
+            try:
+                self._logger.info(f"Stats: {self.ws.stats()}")
+            except Exception as e:
+                self._logger.error(f"Couldn't get stats: {e}")
 
     def _get_file_from_ipfs(self, hash: str):
-        return IPFSHelper.get_ipfs_file(hash)
\ No newline at end of file
+        return IPFSHelper.get_ipfs_file_path(hash)
\ No newline at end of file
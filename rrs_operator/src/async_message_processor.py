@@ -0,0 +1,68 @@
+import asyncio
+import typing as tp
+
+from helpers.pinata import AsyncPinataHelper
+from rrs_operator.src.message_processor import MessageProcessor
+from rrs_operator.src.open_ai import AsyncChatGPT
+from rrs_operator.utils.async_adapter import AsyncAdapter
+from rrs_operator.utils.messages import message_report_response
+from rrs_operator.utils.report_context import ReportContext
+from rrs_operator.utils.reports_format_type import ReportsFormatTypeFabric
+
+
+class AsyncMessageProcessor(MessageProcessor):
+    """Asyncio version of the report pipeline. Gateway downloads and ChatGPT use async HTTP clients,
+    Odoo and IPFS calls run in the loop executor. Must be created inside the running event loop.
+    """
+
+    def __init__(self, odoo, tickets_index, occurrences) -> None:
+        super().__init__(odoo, tickets_index, occurrences)
+        self.odoo_async = AsyncAdapter(odoo)
+        self.ticket_manager_async = AsyncAdapter(self.ticket_manager)
+        self.gateway = AsyncPinataHelper()
+        self.chat_gpt = AsyncChatGPT()
+
+    async def process_message(self, message) -> None | str:
+        report_message = self._parse_message(message)
+        if not report_message:
+            return
+        sender_address, report, report_id = report_message
+        email = await self.odoo_async.find_user_email(sender_address)
+
+        if not email:
+            self._logger.debug(f"Address {sender_address} is not registered in Odoo.")
+            return
+
+        context = ReportContext(sender_address)
+        try:
+            return await self._process_report_async(context, report, email, report_id)
+        finally:
+            await asyncio.to_thread(context.cleanup)
+
+    async def _process_report_async(self, context: ReportContext, report: tp.Union[dict, str], email: str, report_id) -> str:
+        sender_address = context.sender_address
+
+        # **1. Determine Report Type**
+        report_type = ReportsFormatTypeFabric.get_report(report, self.ipfs, self._logger)
+        await report_type.handle_report_async(report, sender_address, context, self.gateway)
+
+        # **2. Determine Problem Type**
+        await asyncio.to_thread(self._analyze_logs, context)
+        descriptions_list, priority, source = self._get_problem(context)
+        await asyncio.to_thread(context.cleanup)
+
+        # **3. Ticket Management**
+        logs_hashes = context.logs_hashes
+        self._logger.debug(f"logs_hashes: {logs_hashes}")
+        ticket_ids, is_paid = await self.ticket_manager_async.process_ticket(context, descriptions_list=descriptions_list, priority=priority, source=source, email=email, logs_hashes=logs_hashes)
+
+        # **4. Handle Unpinning for Free Users**
+        await asyncio.to_thread(self._unpin_free_hashes, sender_address, is_paid)
+        if is_paid:
+            self._logger.debug("paid service")
+            # **5. ChatGPT Responses for paid customers**
+            await self.ticket_manager.generate_and_save_solution_async(context, email, self.chat_gpt)
+        return message_report_response(datalog=is_paid, ticket_ids=ticket_ids, sender_address=sender_address, id=report_id)
+
+    async def close(self) -> None:
+        await self.gateway.close()
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import os
+import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+
+import websockets
+from dotenv import load_dotenv
+
+from helpers.logger import Logger
+from .async_message_processor import AsyncMessageProcessor
+from rrs_operator.utils.messages import message_for_subscribing
+
+load_dotenv()
+
+LIBP2P_WS_SERVER = os.getenv("LIBP2P_WS_SERVER")
+OPERATOR_MAX_IN_FLIGHT = int(os.getenv("OPERATOR_MAX_IN_FLIGHT") or 200)
+OPERATOR_BLOCKING_THREADS = int(os.getenv("OPERATOR_BLOCKING_THREADS") or 32)
+RECONNECT_DELAY = 5
+
+
+class AsyncWSClient:
+    """Asyncio version of WSClient. Every report is a task in one event loop: reports from the same sender
+    are processed in order, at most OPERATOR_MAX_IN_FLIGHT reports are processed at once.
+    """
+
+    def __init__(self, odoo, tickets_index, occurrences) -> None:
+        self.odoo = odoo
+        self.tickets_index = tickets_index
+        self.occurrences = occurrences
+        self._logger = Logger("operator-async-ws")
+        self.ws = None
+        self._tasks: tp.Set[asyncio.Task] = set()
+        self._sender_locks: tp.Dict[str, tp.List] = {}
+
+    def run(self) -> None:
+        asyncio.run(self._run())
+
+    def stats(self) -> dict:
+        """Returns the number of reports in flight, the number of senders they belong to
+        and usage of the Odoo connection pool.
+        """
+        return {"in_flight": len(self._tasks), "senders": len(self._sender_locks), "odoo_pool": self.odoo.helper.pool_stats()}
+
+    async def _run(self) -> None:
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=OPERATOR_BLOCKING_THREADS, thread_name_prefix="operator-blocking")
+        )
+        self._msg_processor = AsyncMessageProcessor(self.odoo, self.tickets_index, self.occurrences)
+        self._in_flight = asyncio.Semaphore(OPERATOR_MAX_IN_FLIGHT)
+        try:
+            while True:
+                try:
+                    await self._listen()
+                except (websockets.ConnectionClosed, OSError) as e:
+                    self._logger.debug(f"Connection closed: {e}")
+                except Exception as e:
+                    self._logger.error(f"{e}")
+                await asyncio.sleep(RECONNECT_DELAY)
+        finally:
+            await self._msg_processor.close()
+
+    async def _listen(self) -> None:
+        async with websockets.connect(LIBP2P_WS_SERVER, max_size=None) as ws:
+            self.ws = ws
+            self._logger.debug(f"Connected to {LIBP2P_WS_SERVER}")
+            msg = message_for_subscribing()
+            self._logger.debug(f"Connection msg: {msg}")
+            await ws.send(msg)
+            async for message in ws:
+                await self._in_flight.acquire()
+                task = asyncio.create_task(self._process_message(message))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _process_message(self, message) -> None:
+        json_message = self._parse_frame(message)
+        sender_address = self._get_sender_address(json_message)
+        lock = self._acquire_sender_lock(sender_address)
+        try:
+            async with lock:
+                reponse = await self._msg_processor.process_message(json_message if json_message is not None else message)
+            if reponse:
+                await self.ws.send(reponse)
+        except Exception as e:
+            self._logger.error(f"Couldn't process message from {sender_address}: {e}")
+        finally:
+            self._release_sender_lock(sender_address)
+            self._in_flight.release()
+
+    def _acquire_sender_lock(self, sender_address: str) -> asyncio.Lock:
+        """Returns the lock ordering the reports of the sender and counts the reports waiting for it."""
+        lock_and_users = self._sender_locks.setdefault(sender_address, [asyncio.Lock(), 0])
+        lock_and_users[1] += 1
+        return lock_and_users[0]
+
+    def _release_sender_lock(self, sender_address: str) -> None:
+        lock_and_users = self._sender_locks[sender_address]
+        lock_and_users[1] -= 1
+        if lock_and_users[1] == 0:
+            del self._sender_locks[sender_address]
+
+    def _parse_frame(self, message) -> tp.Optional[dict]:
+        """Parses the frame once, the parsed frame is passed to the message processor."""
+        try:
+            json_message = json.loads(message)
+        except json.JSONDecodeError:
+            return None
+        return json_message if isinstance(json_message, dict) else None
+
+    def _get_sender_address(self, json_message: tp.Optional[dict]) -> str:
+        try:
+            return json_message.get("data", {}).get("address", "")
+        except AttributeError:
+            return ""
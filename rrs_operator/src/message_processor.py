@@ -1,25 +1,74 @@
 import json
+import typing as tp
 from helpers.logger import Logger
-from rrs_operator.utils.files_helper import FilesHelper
 from rrs_operator.utils.ipfs_helper import IPFSHelper
-from helpers.pinata import PinataHelper
+from rrs_operator.utils.bulk_unpinner import BulkUnpinner
 from rrs_operator.utils.hash_cash import HashCache
+from rrs_operator.utils.log_analyzer import LOGS_FILE_NAME, LogAnalyzer
 from rrs_operator.utils.messages import  message_report_response
+from rrs_operator.utils.report_context import ReportContext
 from rrs_operator.utils.ticket_manager import TicketManager
 from rrs_operator.utils.reports_problem_type import ReportsProblemTypeFabric
 from rrs_operator.utils.reports_format_type import ReportsFormatTypeFabric
 
-DESCRIPTION_FILE_NAME = "issue_description.json"
-
 class MessageProcessor:
-    def __init__(self, odoo) -> None:
+    """Created once and shared by the workers. Per-report state lives in `ReportContext`."""
+
+    def __init__(self, odoo, tickets_index, occurrences) -> None:
         self._logger = Logger("message-processor")
         self.ipfs = IPFSHelper()
         self.odoo = odoo
-        self._temp_dir = FilesHelper.create_temp_directory()
+        self.ticket_manager = TicketManager(odoo, tickets_index, occurrences)
 
     def process_message(self, message) -> None | str:
-        json_message = json.loads(message)
+        report_message = self._parse_message(message)
+        if not report_message:
+            return
+        sender_address, report, report_id = report_message
+        email = self.odoo.find_user_email(sender_address)
+
+        if not email:
+            self._logger.debug(f"Address {sender_address} is not registered in Odoo.")
+            return
+
+        context = ReportContext(sender_address)
+        try:
+            return self._process_report(context, report, email, report_id)
+        finally:
+            context.cleanup()
+
+    def _process_report(self, context: ReportContext, report: tp.Union[dict, str], email: str, report_id) -> str:
+        sender_address = context.sender_address
+
+        # **1. Determine Report Type**
+        report_type = ReportsFormatTypeFabric.get_report(report, self.ipfs, self._logger)
+        report_type.handle_report(report, sender_address, context)
+
+        # **2. Determine Problem Type**
+        self._analyze_logs(context)
+        descriptions_list, priority, source = self._get_problem(context)
+        context.cleanup()
+
+        # **3. Ticket Management**
+        logs_hashes = context.logs_hashes
+        self._logger.debug(f"logs_hashes: {logs_hashes}")
+        ticket_ids, is_paid = self.ticket_manager.process_ticket(context, descriptions_list=descriptions_list, priority=priority, source=source, email=email, logs_hashes=logs_hashes)
+
+        # **4. Handle Unpinning for Free Users**
+        self._unpin_free_hashes(sender_address, is_paid)
+        if is_paid:
+            self._logger.debug("paid service")
+            # **5. ChatGPT Responses for paid customers**
+            self.ticket_manager.generate_and_save_solution(context, email)
+        return message_report_response(datalog=is_paid, ticket_ids=ticket_ids, sender_address=sender_address, id=report_id)
+
+    def _parse_message(self, message: tp.Union[str, dict]) -> tuple | None:
+        """Parses the frame from the websocket. The report is passed through the pipeline parsed.
+        :param message: Frame as received or already parsed
+
+        :return: Tuple (sender address, parsed report, report id) or None if the frame is not a report.
+        """
+        json_message = json.loads(message) if isinstance(message, (str, bytes)) else message
         self._logger.debug(f"Got msg: {json_message}")
 
         if "peerId" in json_message:
@@ -30,22 +79,30 @@ class MessageProcessor:
             return
 
         sender_address = message_data.get("address")
-        json_report_message = json.dumps(message_data["report"])
-        email = self.odoo.find_user_email(sender_address)
         report_id = message_data.get("id", "0")
+        return sender_address, message_data["report"], report_id
 
-        if not email:
-            self._logger.debug(f"Address {sender_address} is not registered in Odoo.")
+    def _analyze_logs(self, context: ReportContext) -> None:
+        """Streams the decrypted Home Assistant log from the report workspace and puts the distinct
+        ERROR and WARNING issues to `context.log_issues`. Must be called before the workspace is cleaned up.
+        """
+        log_file = context.workspace.get(LOGS_FILE_NAME)
+        if log_file is None:
             return
+        with log_file.reader() as reader:
+            context.log_issues = LogAnalyzer.analyze(reader)
+        self._logger.debug(f"Log issues: {[issue.summary() for issue in context.log_issues]}")
 
-        # **1. Determine Report Type**
-        report_type = ReportsFormatTypeFabric.get_report(json_report_message, self.ipfs, self._logger)
-        report_type.handle_report(json_report_message, sender_address, self._temp_dir)
+    def _get_problem(self, context: ReportContext) -> tuple:
+        """Determines the problem type from the decrypted issue description kept in the context.
 
-        # **2. Determine Problem Type**
-        issue = self._get_issue()
+        :return: Tuple (descriptions list, priority, source)
+        """
+        issue = context.issue
+        if issue is None:
+            raise Exception("Report has no issue description")
         self._logger.debug(f"Issue: {issue}")
-        problem_handler = ReportsProblemTypeFabric.get_report(issue)
+        problem_handler = ReportsProblemTypeFabric.get_report(issue, context.log_issues)
         self._logger.debug(f"problem_handler: {problem_handler}")
         descriptions_list = problem_handler.get_descriptions()
         self._logger.debug(f"descriptions_list: {descriptions_list}")
@@ -53,30 +110,11 @@ class MessageProcessor:
         self._logger.debug(f"priority: {priority}")
         source = issue["description"].get("source", "")
         self._logger.debug(f"source: {source}")
-        FilesHelper.remove_directory(self._temp_dir)
+        return descriptions_list, priority, source
 
-        # **3. Ticket Management**
-        ticket_manager = TicketManager(self.odoo)
-        logs_hashes = self.ipfs.logs_hashes
-        self._logger.debug(f"logs_hashes: {logs_hashes}")
-        ticket_ids, is_paid = ticket_manager.process_ticket(descriptions_list=descriptions_list, priority=priority, source=source, email=email, sender_address=sender_address, logs_hashes=logs_hashes)
-
-        # **4. Handle Unpinning for Free Users**
+    def _unpin_free_hashes(self, sender_address: str, is_paid: bool) -> None:
         if not is_paid:
             free_hashes = HashCache.get_hashes(sender_address)
             self._logger.debug(f"Free hashes: {free_hashes}")
-            for hash in free_hashes:
-                self._logger.debug(f"Unpinning hash: {hash}")
-                PinataHelper.unpin_file(hash, self._logger)
-                self._logger.debug(f"Hash {hash} unpinned")
+            BulkUnpinner.unpin_pinata(free_hashes, self._logger)
         HashCache.clear_hashes(sender_address)
-        if is_paid:
-            self._logger.debug("paid service")
-            # **5. ChatGPT Responses for paid customers**
-            ticket_manager.generate_and_save_solution(email)
-        return message_report_response(datalog=is_paid, ticket_ids=ticket_ids, sender_address=sender_address, id=report_id)
-
-
-    def _get_issue(self) -> dict:
-        with open(f"{self._temp_dir}/{DESCRIPTION_FILE_NAME}") as f:
-            return json.load(f)
\ No newline at end of file
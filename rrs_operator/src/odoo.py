@@ -1,10 +1,10 @@
 import typing as tp
 
 from tenacity import *
-from datetime import datetime
 
 from helpers.logger import Logger
 from helpers.odoo import OdooHelper
+from helpers.rrs_users_cache import RRSUsersCache
 from rrs_operator.utils.format_hash_str import format_hash
 from dotenv import load_dotenv
 import os
@@ -59,20 +59,37 @@ class Odoo:
             self._logger.error(f"Couldn't create ticket: {e}")
             raise Exception("Failed to create ticket")
     
+    def create_notes_with_logs_hashes(
+        self, notes: tp.List[tp.Tuple[int, str]], text_notes: tp.Optional[tp.List[tp.Tuple[int, str]]] = None
+    ) -> None:
+        """Creates notes with the logs links for all the tickets of the report with one call.
+        :param notes: List of tuples (ticket_id, ipfs_hash)
+        :param text_notes: List of tuples (ticket_id, text) to create in the same call, e.g. the log issues summaries
+        """
+        links = [(ticket_id, f"https://demo.iotlab.cloud/tg/rrs/ipfs/{ipfs_hash}") for ticket_id, ipfs_hash in notes]
+        self.create_notes((text_notes or []) + links)
+
     @retry(wait=wait_fixed(5))
-    def create_note_with_logs_hash(self, ticket_id: int, ipfs_hash: str) -> None:
-        try:
-            record = self.helper.create(
-                model="mail.message",
-                data={
-                    "body": f"https://demo.iotlab.cloud/tg/rrs/ipfs/{ipfs_hash}",
-                    "model": "helpdesk.ticket",
-                    "res_id": ticket_id,
-                },
-            )
-        except Exception as e:
-            self._logger.error(f"Couldn't create note: {e}")
-            raise Exception("Failed to create note")
+    def create_notes(self, notes: tp.List[tp.Tuple[int, str]]) -> None:
+        """Creates notes for the tickets with one call.
+        The records are created in one transaction, so on failure the whole batch is retried.
+        :param notes: List of tuples (ticket_id, note body)
+        """
+        if not notes:
+            return
+        records = [
+            {
+                "body": body,
+                "model": "helpdesk.ticket",
+                "res_id": ticket_id,
+            }
+            for ticket_id, body in notes
+        ]
+        record_ids = self.helper.create_many(model="mail.message", data_list=records)
+        if record_ids is None:
+            self._logger.error(f"Couldn't create {len(records)} notes")
+            raise Exception("Failed to create notes")
+        self._logger.debug(f"Created {len(record_ids)} notes")
 
     @retry(wait=wait_fixed(5))
     def find_user_email(self, address) -> tp.Optional[str]:
@@ -83,11 +100,10 @@ class Odoo:
         """
         self._logger.debug(f"start looking for email.. {address}")
         try:
-            user_id = self._find_user_id(address)
-            self._logger.debug(f"user id: {user_id}")
-            if user_id:
-                user_data = self.helper.read(model="rrs.register", record_ids=user_id, fields=["customer_email"])
-                email = user_data[0]['customer_email']
+            user_data = RRSUsersCache.get_or_load(self.helper, "address", address)
+            self._logger.debug(f"user id: {user_data and user_data['id']}")
+            if user_data:
+                email = user_data['customer_email']
                 self._logger.debug(f"Find user's email: {email}")
                 return email
             else:
@@ -98,33 +114,33 @@ class Odoo:
             raise Exception("Failed to find email")
     
 
-    def _find_user_id(self, address: str) -> list:
-        """Find a user id by the parachain address. This id is used to retrive the user's email.
-        :param address: User's address in Robonomics parachain
+    @retry(wait=wait_fixed(5))
+    def find_tickets_with_descriptions(self, descriptions: list, email: str) -> tp.Dict[str, int]:
+        """Looks for open tickets for all the descriptions with one search.
+        :param descriptions: Problems' descriptions from the report
+        :param email: Customer's email address
 
-        :return: The list with user id.
+        :return: Dict description -> ticket id for the descriptions that already have a ticket.
         """
-        id = self.helper.search(model="rrs.register", search_domains=[("address", "=", address)])
-        self._logger.debug(f"Find user with id: {id}")
-        return id
-
-    def find_ticket_with_description(self, description: str, email: str) -> int:
-        """ """
-        description = f"Issue from HA: {description}"
-        self._logger.debug(f"Looking for a ticket for email: {email}, description: {description}")
-        ticket_ids = self.helper.search(
+        full_descriptions = {f"Issue from HA: {description}": description for description in descriptions}
+        if not full_descriptions:
+            return {}
+        self._logger.debug(f"Looking for tickets for email: {email}, {len(full_descriptions)} descriptions")
+        tickets = self.helper.search_read(
             model="helpdesk.ticket", search_domains=[
-                ("description", "=", description), 
-                ("partner_email", "=", email), 
+                ("description", "in", list(full_descriptions)),
+                ("partner_email", "=", email),
                 ("stage_id", "in", [int(ODOO_HELPDESK_NEW_STAGE_ID), int(ODOO_HELPDESK_INPROGRESS_STAGE_ID)])
-            ]
+            ],
+            fields=["id", "description"],
         )
-        self._logger.debug(f"Ticket ids: {ticket_ids}")
-
-        if ticket_ids:
-            self._logger.debug(f"Found tickets with the description: {ticket_ids}")
-            return ticket_ids[0]
-        self._logger.debug(f"No ticket found")
+        found_tickets = {}
+        for ticket in tickets:
+            description = full_descriptions.get(ticket["description"])
+            if description is not None and description not in found_tickets:
+                found_tickets[description] = ticket["id"]
+        self._logger.debug(f"Found tickets with the descriptions: {found_tickets}")
+        return found_tickets
 
     def find_ticket_with_source(self, source: str, email: str) -> int:
         """ """
@@ -145,71 +161,62 @@ class Odoo:
         self._logger.debug(f"No ticket found")
 
     @retry(wait=wait_fixed(5))
-    def get_hashes_from_ticket(self, ticket_id: int) -> list:
-        self._logger.debug(f"Looking for ipfs hashes in ticket {ticket_id}")
-        message_ids = self.helper.search(model="mail.message", search_domains=[("model", "=", "helpdesk.ticket"), ("res_id", "=", ticket_id)])
-        messages = self.helper.read(model="mail.message", record_ids=[message_ids], fields=["id", "body"])
+    def get_hashes_from_tickets(self, ticket_ids: list) -> list:
+        """Finds the ipfs hashes in the notes of all the tickets with one call."""
+        self._logger.debug(f"Looking for ipfs hashes in tickets {ticket_ids}")
+        if not ticket_ids:
+            return []
+        messages = self.helper.search_read(
+            model="mail.message",
+            search_domains=[("model", "=", "helpdesk.ticket"), ("res_id", "in", list(ticket_ids))],
+            fields=["id", "body"],
+        )
         hashes = [msg["body"] for msg in messages if msg["body"].startswith(f"<p>{ODOO_LOGS_LINK_FORMAT}Qm")]
         hashes = [format_hash(hash) for hash in hashes]
         return hashes
     
-    @retry(wait=wait_fixed(5))
-    def get_and_increase_problem_counter(self, ticket_id: int):
-        self._logger.debug(f"Increasing problem counter...")
-        counter = self.helper.read("helpdesk.ticket", [ticket_id], ["count"])[0]["count"]
-        self._logger.debug(f"Updating counter for ticket {ticket_id}... Current counter is: {counter}")
-        try: 
-            return self.helper.update(
-                "helpdesk.ticket",
-                ticket_id,
-                {
-                    "count": int(counter)+1,
-                },
-            )
-        except Exception as e:
-            self._logger.error(f"Couldn't update counter {e}")
-            raise Exception("Failed to update counter")
-        
-    @retry(wait=wait_fixed(5))
-    def get_and_update_description(self, ticket_id: int, new_description: str) -> bool:
-        self._logger.debug(f"CUpdating description...")
-        current_description = self.get_description_from_ticket(ticket_id)
-        self._logger.debug(f"Updating description for ticket {ticket_id}...")
-        try: 
-            return self.helper.update(
-                "helpdesk.ticket",
-                ticket_id,
-                {
-                    "description": f"{current_description} {new_description}",
-                },
-            )
-        except Exception as e:
-            self._logger.error(f"Couldn't update description {e}")
-            raise Exception("Failed to update description")
-    
-    @retry(wait=wait_fixed(5))
-    def get_description_from_ticket(self, ticket_id: int) -> str:
-        self._logger.debug(f"Getting description from ticket...")
-        description = self.helper.read("helpdesk.ticket", [ticket_id], ["description"])[0]["description"]
-        return description
+    def read_tickets(self, ticket_ids: list, fields: list) -> tp.Dict[int, dict]:
+        """Reads the fields of several tickets with one call.
+        Not retried here, OccurrencesBuffer retries it until it is stopped.
+        :param ticket_ids: Ids of the tickets
+        :param fields: Fields to read
+
+        :return: Dict ticket id -> ticket data. Deleted tickets are missing.
+        """
+        tickets = self.helper.search_read(model="helpdesk.ticket", search_domains=[("id", "in", list(ticket_ids))], fields=fields)
+        return {ticket["id"]: ticket for ticket in tickets}
+
+    def update_tickets(self, updates: tp.Dict[int, dict]) -> tp.Dict[int, Exception]:
+        """Writes the data to several tickets at once. Tickets with the same data are written with one call,
+        the rest with one write per ticket over the pooled connections.
+        Not retried here, OccurrencesBuffer retries the failed tickets until it is stopped.
+        :param updates: Dict ticket id -> data to write
+
+        :return: Dict ticket id -> error for the tickets which were not updated
+        """
+        self._logger.debug(f"Updating {len(updates)} tickets...")
+        groups: tp.Dict[tuple, tp.Tuple[dict, list]] = {}
+        for ticket_id, data in updates.items():
+            groups.setdefault(tuple(sorted(data.items())), (data, []))[1].append(ticket_id)
+        errors = {}
+        single_updates = {}
+        for data, ticket_ids in groups.values():
+            if len(ticket_ids) == 1:
+                single_updates[ticket_ids[0]] = data
+                continue
+            try:
+                self.helper.update_many("helpdesk.ticket", ticket_ids, data)
+            except Exception as e:
+                errors.update((ticket_id, e) for ticket_id in ticket_ids)
+        results = self.helper.batch(
+            [("helpdesk.ticket", "write", [[ticket_id], data]) for ticket_id, data in single_updates.items()],
+            return_exceptions=True,
+        )
+        errors.update((ticket_id, result) for ticket_id, result in zip(single_updates, results) if isinstance(result, Exception))
+        for ticket_id, error in errors.items():
+            self._logger.error(f"Couldn't update ticket {ticket_id}: {error}")
+        return errors
 
-    @retry(wait=wait_fixed(5))
-    def set_last_occurred(self, ticket_id: int) -> bool:
-        self._logger.debug(f"Setting last occured...")
-        current_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self._logger.debug(f"Updating last occurred for ticket {ticket_id}... Current date: {current_datetime}")
-        try: 
-            return self.helper.update(
-                "helpdesk.ticket",
-                ticket_id,
-                {
-                    "last_occurred": f"{current_datetime}",
-                },
-            )
-        except Exception as e:
-            self._logger.error(f"Couldn't update last occurred {e}")
-            raise Exception("Failed to update last occurred")
-    
     @retry(wait=wait_fixed(5))
     def is_paid(self, address: str) -> bool:
         """Check if the customer has paid for the service.
@@ -218,9 +225,9 @@ class Odoo:
         :return: bool
         """
         self._logger.debug(f"Checking if is paid...")
-        user_id = self._find_user_id(address)
-        if user_id:
-            return self.helper.read("rrs.register", user_id, ["paid"])[0]["paid"]
+        user_data = RRSUsersCache.get_or_load(self.helper, "address", address)
+        if user_data:
+            return user_data["paid"]
     
     @retry(wait=wait_fixed(5))
     def save_chatgpt_solution_to_notes(self, ticket_id: int, response: str) -> None:
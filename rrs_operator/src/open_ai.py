@@ -1,4 +1,4 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
 import os
 
@@ -6,6 +6,8 @@ from helpers.logger import Logger
 
 load_dotenv()
 OPEN_AI_API_KEY = os.getenv("OPEN_AI_API_KEY")
+MODEL = "gpt-4o"
+INSTRUCTIONS = "This is an issue from Home Assistant. Suggest the best and most straightforward solution. Format the response as a well-structured HTML email, including <html>, <head>, and <body>. Return no triple backticks. Do not include any closing remarks, sign-offs, or sender details."
 
 class ChatGPT:
     def __init__(self):
@@ -14,10 +16,22 @@ class ChatGPT:
     
     def generate_response(self, description: str) -> str:
         response = self.openai_client.responses.create(
-            model="gpt-4o",
-            instructions="This is an issue from Home Assistant. Suggest the best and most straightforward solution. Format the response as a well-structured HTML email, including <html>, <head>, and <body>. Return no triple backticks. Do not include any closing remarks, sign-offs, or sender details.",
+            model=MODEL,
+            instructions=INSTRUCTIONS,
             input=description,
         )
         return response.output_text
 
 
+class AsyncChatGPT:
+    def __init__(self):
+        self.openai_client = AsyncOpenAI(api_key=OPEN_AI_API_KEY)
+        self._logger = Logger("openAI-operator")
+
+    async def generate_response(self, description: str) -> str:
+        response = await self.openai_client.responses.create(
+            model=MODEL,
+            instructions=INSTRUCTIONS,
+            input=description,
+        )
+        return response.output_text
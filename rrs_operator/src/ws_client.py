@@ -1,4 +1,8 @@
+import json
 import os
+import threading
+import time
+import typing as tp
 
 import websocket
 from dotenv import load_dotenv
@@ -6,17 +10,38 @@ from dotenv import load_dotenv
 from helpers.logger import Logger
 from .message_processor import MessageProcessor
 from rrs_operator.utils.messages import message_for_subscribing
+from rrs_operator.utils.reports_queue import REPORTS_VISIBILITY_TIMEOUT, ReportsQueue
 
 load_dotenv()
 
 LIBP2P_WS_SERVER = os.getenv("LIBP2P_WS_SERVER")
 ADMIN_SEED = os.getenv("ADMIN_SEED")
+OPERATOR_WORKERS = int(os.getenv("OPERATOR_WORKERS") or 4)
+# Max number of the reports waiting or processed. When the queue is full, the socket callback waits for a free slot,
+# so the server doesn't get more frames read from the socket than the workers can process.
+OPERATOR_QUEUE_SIZE = int(os.getenv("OPERATOR_QUEUE_SIZE") or 100)
+QUEUE_FULL_LOG_INTERVAL = 30
+REPORT_RETRY_DELAY = 30
+# Pause of a worker after an error of the queue itself, e.g. "database is locked".
+WORKER_ERROR_DELAY = 1
+# Taken reports are kept invisible in the queue while they are processed, whatever long it takes.
+REPORTS_HEARTBEAT_INTERVAL = REPORTS_VISIBILITY_TIMEOUT / 3
 
 class WSClient:
-    def __init__(self, odoo) -> None:
+    def __init__(self, odoo, tickets_index, occurrences) -> None:
         self.odoo = odoo
+        self.tickets_index = tickets_index
+        self.occurrences = occurrences
         self._logger = Logger("operator-ws")
+        self._msg_processor = MessageProcessor(odoo, tickets_index, occurrences)
+        self._reports = ReportsQueue(max_size=OPERATOR_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._in_flight: tp.Set[int] = set()
+        self._processed = 0
         self._connect2server()
+        for i in range(OPERATOR_WORKERS):
+            threading.Thread(target=self._work, name=f"operator-worker-{i}", daemon=True).start()
+        threading.Thread(target=self._heartbeat, name="operator-heartbeat", daemon=True).start()
 
     def _connect2server(self):
         self.ws = websocket.WebSocketApp(
@@ -36,10 +61,87 @@ class WSClient:
         self._logger.debug(f"Connection msg: {msg}")
         self.ws.send(msg)
 
+    def stats(self) -> dict:
+        """Returns depth of the durable queue, utilization of the workers processing the reports
+        and usage of the Odoo connection pool.
+        """
+        with self._lock:
+            workers = {
+                "workers": OPERATOR_WORKERS,
+                "busy": len(self._in_flight),
+                "utilization": len(self._in_flight) / OPERATOR_WORKERS,
+                "processed": self._processed,
+            }
+        return {"queue": self._reports.stats(), "workers": workers, "odoo_pool": self.odoo.helper.pool_stats()}
+
     def _on_message(self, ws, message):
-        msg_processor = MessageProcessor(self.odoo)
-        reponse = msg_processor.process_message(message)
-        self.ws.send(reponse)
+        sender_address = self._get_sender_address(message)
+        while self._reports.put(sender_address, message, timeout=QUEUE_FULL_LOG_INTERVAL) is None:
+            self._logger.error(f"Reports queue is full, waiting for a free slot: {self.stats()}")
+
+    def _work(self):
+        """Takes a report from the durable queue only when the worker is free, so the visibility timeout
+        doesn't run while the report waits. The queue gives the reports of one sender one by one.
+        Errors of the queue are logged and the worker goes on, so the number of workers doesn't drop.
+        """
+        while True:
+            try:
+                self._work_once()
+            except Exception as e:
+                self._logger.error(f"Worker error, continuing in {WORKER_ERROR_DELAY} sec: {e}")
+                time.sleep(WORKER_ERROR_DELAY)
+
+    def _work_once(self):
+        report_id, sender_address, message, response = self._reports.take()
+        with self._lock:
+            self._in_flight.add(report_id)
+        retry_delay = None
+        try:
+            self._process_report(report_id, message, response)
+        except Exception as e:
+            self._logger.error(f"Couldn't process report {report_id}, will retry in {REPORT_RETRY_DELAY} sec: {e}")
+            retry_delay = REPORT_RETRY_DELAY
+        # Under the lock, so the heartbeat doesn't hide the released report again. If the ack or release fails,
+        # the report is not extended anymore and is delivered again after the visibility timeout.
+        with self._lock:
+            self._in_flight.discard(report_id)
+            self._processed += 1
+            if retry_delay is None:
+                self._reports.ack(report_id)
+            else:
+                self._reports.release(report_id, retry_delay)
+        self._logger.debug(f"Workers: {self.stats()}")
+
+    def _heartbeat(self):
+        """Extends the visibility of the reports in progress. Odoo calls and downloads retry until they succeed,
+        so a report may be processed longer than the visibility timeout and must not be delivered twice.
+        """
+        while True:
+            time.sleep(REPORTS_HEARTBEAT_INTERVAL)
+            with self._lock:
+                try:
+                    self._reports.extend(self._in_flight)
+                except Exception as e:
+                    self._logger.error(f"Couldn't extend visibility of the reports in progress: {e}")
+
+    def _process_report(self, report_id, message, response):
+        """Processes the report and sends the response. The pipeline is not idempotent (tickets, notes, emails,
+        unpins), so a report processed before only gets its stored response sent again.
+        """
+        if response is None:
+            response = self._msg_processor.process_message(message) or ""
+            self._reports.save_response(report_id, response)
+        else:
+            self._logger.debug(f"Report {report_id} is already processed, sending the stored response")
+        if response:
+            self.ws.send(response)
+
+    def _get_sender_address(self, message) -> str:
+        """Reports from the same sender are processed in order, so the sender address is the key for the workers."""
+        try:
+            return json.loads(message).get("data", {}).get("address", "")
+        except (json.JSONDecodeError, AttributeError):
+            return ""
 
     def _on_error(self, ws, error):
         self._logger.error(f"{error}")
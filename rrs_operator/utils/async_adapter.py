@@ -0,0 +1,22 @@
+import asyncio
+import functools
+
+
+class AsyncAdapter:
+    """Async facade over a blocking helper: every method call runs in a thread of the event loop executor,
+    so the loop stays free while XML-RPC, IPFS or other blocking clients wait for the network.
+    """
+
+    def __init__(self, obj) -> None:
+        self._obj = obj
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._obj, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(attr, *args, **kwargs)
+
+        return call
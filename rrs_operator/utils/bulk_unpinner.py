@@ -0,0 +1,53 @@
+import os
+import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from helpers.logger import Logger
+from helpers.pinata import PinataHelper
+from rrs_operator.utils.ipfs_helper import IPFSHelper
+
+load_dotenv()
+UNPIN_WORKERS = int(os.getenv("UNPIN_WORKERS") or 8)
+
+_executor = ThreadPoolExecutor(max_workers=UNPIN_WORKERS, thread_name_prefix="unpin")
+
+
+class BulkUnpinner:
+    """Unpins batches of hashes from the local IPFS node or from Pinata concurrently.
+    Pinata requests go through the process-wide Pinata rate limit, the IPFS clients are taken from the pool.
+    """
+
+    @staticmethod
+    def unpin_local(hashes: tp.List[str], logger: Logger) -> tp.Dict[str, str]:
+        """
+        :return: Dict hash -> "unpinned", "not_pinned" or "failed"
+        """
+        return BulkUnpinner._unpin(hashes, IPFSHelper.unpin_hash, "the IPFS node", logger)
+
+    @staticmethod
+    def unpin_pinata(hashes: tp.List[str], logger: Logger) -> tp.Dict[str, str]:
+        """
+        :return: Dict hash -> "unpinned", "not_pinned" or "failed"
+        """
+        return BulkUnpinner._unpin(hashes, lambda hash: PinataHelper.unpin_file(hash, logger), "Pinata", logger)
+
+    @staticmethod
+    def _unpin(hashes: tp.List[str], unpin: tp.Callable[[str], str], target: str, logger: Logger) -> tp.Dict[str, str]:
+        hashes = list(dict.fromkeys(hashes))
+        if not hashes:
+            return {}
+        futures = {hash: _executor.submit(unpin, hash) for hash in hashes}
+        outcomes = {}
+        for hash, future in futures.items():
+            try:
+                outcomes[hash] = future.result()
+            except Exception as e:
+                logger.error(f"Couldn't unpin hash {hash} from {target}: {e}")
+                outcomes[hash] = "failed"
+        failed = [hash for hash, outcome in outcomes.items() if outcome == "failed"]
+        logger.debug(f"Unpinned {len(hashes) - len(failed)} of {len(hashes)} hashes from {target}")
+        if failed:
+            logger.error(f"Couldn't unpin hashes from {target}: {failed}")
+        return outcomes
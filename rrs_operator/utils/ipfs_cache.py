@@ -0,0 +1,197 @@
+import os
+import re
+import shutil
+import threading
+import typing as tp
+import uuid
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+IPFS_CACHE_DIR = os.getenv("IPFS_CACHE_DIR") or "ipfs_cache"
+IPFS_CACHE_SIZE = int(os.getenv("IPFS_CACHE_SIZE") or 512 * 1024 * 1024)
+COPY_CHUNK_SIZE = 1024 * 1024
+
+_CID_RE = re.compile(r"^[A-Za-z0-9]{32,128}$")
+
+
+class IPFSFilesCache:
+    """Size-bounded on-disk LRU cache of the IPFS files. The content is immutable,
+    so a file is stored once under its CID and never has to be revalidated.
+    """
+
+    def __init__(self, directory: str = IPFS_CACHE_DIR, max_size: int = IPFS_CACHE_SIZE) -> None:
+        """
+        :param directory: Directory for the cached files. Files left from the previous runs are reused.
+        :param max_size: Max total size of the cached files in bytes
+        """
+        self._directory = directory
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def get(self, cid: str) -> tp.Optional[str]:
+        """Returns path to the cached file or None if the file is not cached."""
+        with self._lock:
+            if cid not in self._files:
+                self._misses += 1
+                return None
+            self._files.move_to_end(cid)
+            self._hits += 1
+        try:
+            # Keeps the LRU order for the next start.
+            os.utime(self._path(cid))
+        except OSError:
+            pass
+        return self._path(cid)
+
+    def put_file(self, cid: str, path_to_file: str) -> None:
+        """Copies the file to the cache if it is not cached yet."""
+        if not self._is_cacheable(cid, os.path.getsize(path_to_file)):
+            return
+        tmp_path = self._tmp_path(cid)
+        shutil.copyfile(path_to_file, tmp_path)
+        self._commit(cid, tmp_path)
+
+    def put_bytes(self, cid: str, content: bytes) -> None:
+        """Writes the content to the cache if it is not cached yet."""
+        if not self._is_cacheable(cid, len(content)):
+            return
+        self.put_chunks(cid, [content])
+
+    def put_reader(self, cid: str, reader: tp.BinaryIO) -> None:
+        """Copies the content of the binary file object from its position to the cache if it is not cached yet."""
+        position = reader.tell()
+        size = reader.seek(0, os.SEEK_END) - position
+        reader.seek(position)
+        if not self._is_cacheable(cid, size):
+            return
+        self.put_chunks(cid, iter(lambda: reader.read(COPY_CHUNK_SIZE), b""))
+
+    def put_chunks(self, cid: str, chunks: tp.Iterable[bytes]) -> tp.Optional[str]:
+        """Writes the streamed content to the cache chunk by chunk.
+
+        :return: Path to the cached file or None if the CID is not valid
+        """
+        if not self.is_cid(cid):
+            return None
+        tmp_path = self._tmp_path(cid)
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        except BaseException:
+            self._remove_path(tmp_path)
+            raise
+        self._commit(cid, tmp_path)
+        return self._path(cid)
+
+    def remove(self, cid: str) -> None:
+        """Removes the file from the cache, e.g. when its content is unpinned and must not be served anymore."""
+        with self._lock:
+            size = self._files.pop(cid, None)
+            if size is not None:
+                self._size -= size
+        if size is not None:
+            self._remove(cid)
+
+    def stats(self) -> tp.Dict[str, int]:
+        """Returns number of cached files, their total size, hits, misses and evictions."""
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "size": self._size,
+                "max_size": self._max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+    @staticmethod
+    def is_cid(value: str) -> bool:
+        return bool(_CID_RE.match(value or ""))
+
+    def _is_cacheable(self, cid: str, size: int) -> bool:
+        if not self.is_cid(cid) or size > self._max_size:
+            return False
+        with self._lock:
+            return cid not in self._files
+
+    def _commit(self, cid: str, tmp_path: str) -> None:
+        os.replace(tmp_path, self._path(cid))
+        size = os.path.getsize(self._path(cid))
+        with self._lock:
+            if cid in self._files:
+                return
+            self._files[cid] = size
+            self._size += size
+            evicted = self._evict()
+        for evicted_cid in evicted:
+            self._remove(evicted_cid)
+
+    def _evict(self) -> tp.List[str]:
+        evicted = []
+        # The newest file is kept even if it is bigger than the cache, it is about to be read.
+        while self._size > self._max_size and len(self._files) > 1:
+            cid, size = self._files.popitem(last=False)
+            self._size -= size
+            self._evictions += 1
+            evicted.append(cid)
+        return evicted
+
+    def _load(self) -> None:
+        files = []
+        for name in os.listdir(self._directory):
+            path = os.path.join(self._directory, name)
+            if name.endswith(".tmp"):
+                self._remove_stale_tmp(path, name)
+            elif self.is_cid(name):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name, stat.st_size))
+        for _, cid, size in sorted(files):
+            self._files[cid] = size
+            self._size += size
+        for cid in self._evict():
+            self._remove(cid)
+
+    def _remove_stale_tmp(self, path: str, name: str) -> None:
+        """Removes the part file left by a process that is not running anymore. Part files of the running
+        processes are being written right now, they are kept.
+        """
+        parts = name.split(".")
+        if len(parts) != 4 or not parts[1].isdigit():
+            return
+        pid = int(parts[1])
+        if pid == os.getpid():
+            return
+        try:
+            os.kill(pid, 0)
+            return
+        except ProcessLookupError:
+            pass
+        except OSError:
+            return
+        self._remove_path(path)
+
+    def _remove(self, cid: str) -> None:
+        self._remove_path(self._path(cid))
+
+    @staticmethod
+    def _remove_path(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _path(self, cid: str) -> str:
+        return os.path.join(self._directory, cid)
+
+    def _tmp_path(self, cid: str) -> str:
+        return os.path.join(self._directory, f"{cid}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
@@ -1,4 +1,8 @@
 import os
+import queue
+import threading
+import typing as tp
+from contextlib import contextmanager
 
 import ipfshttpclient2
 from dotenv import load_dotenv
@@ -6,43 +10,204 @@ from termcolor import colored
 
 from helpers.logger import Logger
 from rrs_operator.utils.files_helper import FilesHelper
+from rrs_operator.utils.ipfs_cache import IPFSFilesCache
+from rrs_operator.utils.pinned_index import PinnedIndex, file_digest
 
 load_dotenv()
 IPFS_ENDPOINT = os.getenv("IPFS_ENDPOINT")
+IPFS_CLIENTS = int(os.getenv("IPFS_CLIENTS") or 4)
+
+
+class IPFSClientsPool:
+    """Small pool of long-lived IPFS clients with keep-alive sessions.
+    A client is not shared between threads: every call checks out a client of its own.
+    """
+
+    def __init__(self, endpoint: str, size: int = IPFS_CLIENTS) -> None:
+        self._endpoint = endpoint
+        self._size = max(1, int(size))
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=self._size)
+        self._lock = threading.Lock()
+        self._created = 0
+
+    @contextmanager
+    def client(self) -> tp.Iterator[ipfshttpclient2.Client]:
+        """Checks out a client for the time of the ``with`` block."""
+        client = self._acquire()
+        try:
+            yield client
+        except ipfshttpclient2.exceptions.CommunicationError:
+            # The session may be broken, connect again next time.
+            self._discard(client)
+            raise
+        except BaseException:
+            self._idle.put_nowait(client)
+            raise
+        else:
+            self._idle.put_nowait(client)
+
+    def _acquire(self) -> ipfshttpclient2.Client:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self._size
+            if create:
+                self._created += 1
+        if not create:
+            return self._idle.get()
+        try:
+            return ipfshttpclient2.connect(self._endpoint, session=True)
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _discard(self, client: ipfshttpclient2.Client) -> None:
+        with self._lock:
+            self._created -= 1
+        try:
+            client.close()
+        except Exception:
+            pass
+
+
+class _Lazy:
+    """Creates the shared object on the first use. Importing the module has no side effects then,
+    e.g. in the spawned decryption processes, which import the whole application.
+    """
+
+    def __init__(self, factory: tp.Callable[[], tp.Any]) -> None:
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value = None
+
+    def __call__(self) -> tp.Any:
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+        return self._value
+
+
+_clients = _Lazy(lambda: IPFSClientsPool(IPFS_ENDPOINT))
+_pinned = _Lazy(PinnedIndex)
+_cache = _Lazy(IPFSFilesCache)
+
 
 class IPFSHelper:
     def __init__(self) -> None:
         self._logger = Logger("ipfs")
-        self.logs_hashes = []
-    
-    def pin_file(self, path_to_file: str) -> None:
-        with ipfshttpclient2.connect(IPFS_ENDPOINT) as client:
-            response = client.add(path_to_file)
+
+    def pin_file(self, path_to_file: str) -> str:
+        """Pins the file to the local IPFS node.
+
+        :return: IPFS hash of the file
+        """
+        return self.pin_files([path_to_file])[0]
+
+    def pin_files(self, files: tp.List[tp.Union[str, tp.BinaryIO]]) -> tp.List[str]:
+        """Pins the files to the local IPFS node with one `add` call. Every file is added on its own
+        (not wrapped with a directory), so the hashes are the same as from the separate adds.
+        Files with the content that is already pinned are not uploaded again, their CIDs are taken from the index.
+        :param files: Paths to the files or seekable binary file objects with `name`, e.g. in-memory buffers
+
+        :return: IPFS hashes of the files in the same order
+        """
+        if not files:
+            return []
+        digests = [file_digest(file) for file in files]
+        pinned = self._get_pinned(digests)
+        hashes = [pinned.get(digest) for digest in digests]
+        files_to_add = [file for file, hash in zip(files, hashes) if hash is None]
+        if len(files) > len(files_to_add):
+            self._logger.debug(f"Content of {len(files) - len(files_to_add)} files is already pinned, skipping upload")
+        if files_to_add:
+            with _clients().client() as client:
+                response = client.add(*files_to_add)
             self._logger.debug(f"Done pinning. Response is: {response}")
-            self.logs_hashes.append(response["Hash"])
-    
+            if isinstance(response, dict):
+                response = [response]
+            added = {item["Name"]: item["Hash"] for item in response}
+            for i, file in enumerate(files):
+                if hashes[i] is None:
+                    hashes[i] = added[os.path.basename(file if isinstance(file, str) else file.name)]
+                    _pinned().add(digests[i], hashes[i])
+        self._warm_cache(files, hashes)
+        return hashes
+
     @staticmethod
-    def unpin_hash(hash: str) -> None:
-        with ipfshttpclient2.connect(IPFS_ENDPOINT) as client:
+    def unpin_hash(hash: str) -> str:
+        """Unpins the hash from the local IPFS node. The file is removed from the disk cache too,
+        so the deleted logs are not served anymore.
+
+        :return: "unpinned" or "not_pinned"
+        """
+        with _clients().client() as client:
             try:
                 res = client.pin.rm(hash)
+                outcome = "unpinned"
                 print(f"Unpinned {res['Pins']}")
             except ipfshttpclient2.exceptions.ErrorResponse:
+                outcome = "not_pinned"
                 print(f"Hash {hash} already unpinned.")
-                pass
+        _pinned().remove_cid(hash)
+        _cache().remove(hash)
+        return outcome
 
     @staticmethod
-    def get_ipfs_file(hash: str) -> str:
-        with ipfshttpclient2.connect(IPFS_ENDPOINT) as client:
-            try:
-                res = client.cat(hash)
-                return res.decode('utf-8')
-            except Exception as e:
-                print(colored(f"Couldn't get hash {hash} from ipfs node: {e}", 'red'))
-    
+    def get_ipfs_file_path(hash: str) -> tp.Optional[str]:
+        """Returns path to the file in the local disk cache. On a miss the file is streamed
+        from the IPFS node to the cache chunk by chunk.
 
+        :return: Path to the file or None if the file couldn't be got
+        """
+        path_to_cached_file = _cache().get(hash)
+        if path_to_cached_file is not None and os.path.exists(path_to_cached_file):
+            return path_to_cached_file
+        try:
+            with _clients().client() as client:
+                chunks = client.cat(hash, stream=True)
+                try:
+                    return _cache().put_chunks(hash, chunks)
+                finally:
+                    chunks.close()
+        except Exception as e:
+            print(colored(f"Couldn't get hash {hash} from ipfs node: {e}", 'red'))
 
+    @staticmethod
+    def cache_stats() -> tp.Dict[str, int]:
+        return _cache().stats()
 
-    
-
+    def _get_pinned(self, digests: tp.List[str]) -> tp.Dict[str, str]:
+        """Returns dict digest -> CID for the content that is still pinned to the node."""
+        pinned = _pinned().get_many(digests)
+        if not pinned:
+            return {}
+        with _clients().client() as client:
+            try:
+                client.pin.ls(*set(pinned.values()), type="recursive")
+                return pinned
+            except ipfshttpclient2.exceptions.ErrorResponse:
+                pass
+            still_pinned = {}
+            for digest, cid in pinned.items():
+                try:
+                    client.pin.ls(cid, type="recursive")
+                    still_pinned[digest] = cid
+                except ipfshttpclient2.exceptions.ErrorResponse:
+                    _pinned().remove_cid(cid)
+            return still_pinned
 
+    def _warm_cache(self, files: tp.List[tp.Union[str, tp.BinaryIO]], hashes: tp.List[str]) -> None:
+        """Copies the pinned files to the disk cache, so the first view of the logs is served locally."""
+        for file, hash in zip(files, hashes):
+            try:
+                if isinstance(file, str):
+                    _cache().put_file(hash, file)
+                else:
+                    file.seek(0)
+                    _cache().put_reader(hash, file)
+            except OSError as e:
+                self._logger.error(f"Couldn't cache file {file if isinstance(file, str) else file.name}: {e}")
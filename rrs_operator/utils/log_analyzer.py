@@ -0,0 +1,142 @@
+import io
+import os
+import re
+import typing as tp
+
+from dotenv import load_dotenv
+
+load_dotenv()
+# Max number of distinct signatures kept per log, the memory doesn't grow with the log size.
+LOG_ANALYZER_MAX_SIGNATURES = int(os.getenv("LOG_ANALYZER_MAX_SIGNATURES") or 1000)
+# Max number of issues reported for one log. Every issue becomes a ticket, and a ChatGPT solution for paid customers.
+# The rest are folded into one more "other issues" ticket.
+LOG_ANALYZER_MAX_ISSUES = int(os.getenv("LOG_ANALYZER_MAX_ISSUES") or 3)
+# Max number of the folded issues listed in the note of the "other issues" ticket.
+OTHER_ISSUES_IN_SUMMARY = 10
+LOGS_FILE_NAME = "home-assistant.log"
+MAX_LINE_LENGTH = 64 * 1024
+MAX_TEMPLATE_LENGTH = 300
+
+# 2024-01-15 10:23:45.123 ERROR (MainThread) [homeassistant.components.zha] Message
+_ENTRY_RE = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(?:\.\d+)? (WARNING|ERROR|CRITICAL) \([^)]*\) \[([^\]]+)\] (.*)$"
+)
+# One pass over the message: the alternatives are tried in order at every position, so numbers inside
+# the addresses and ids are not replaced on their own. The lookahead skips the positions no alternative can match.
+_VARIABLE_RE = re.compile(
+    r"(?=['\"0-9a-fA-F])"
+    r"(?:(?P<str>(?<!\w)'[^']*'|\"[^\"]*\")"
+    r"|(?P<uuid>\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b)"
+    r"|(?P<time>\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?)"
+    r"|(?P<ip>\b(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?\b)"
+    r"|(?P<mac>\b(?:[0-9a-fA-F]{2}:){5}[0-9a-fA-F]{2}\b)"
+    r"|(?P<hex>\b0x[0-9a-fA-F]+\b)"
+    r"|(?P<num>\b\d+(?:\.\d+)?(?=[a-zA-Zµ]*\b)))"
+)
+_PLACEHOLDERS = {name: f"<{name}>" for name in _VARIABLE_RE.groupindex}
+_LEVELS_ORDER = {"CRITICAL": 0, "ERROR": 1, "WARNING": 2}
+
+
+class LogIssue:
+    """Distinct problem found in the log: all the entries with the same level, logger and message template."""
+
+    def __init__(self, level: str, logger_name: str, template: str, timestamp: str) -> None:
+        self.level = level
+        self.logger_name = logger_name
+        self.template = template
+        self.count = 0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+
+    @property
+    def description(self) -> str:
+        """Stable text of the issue. Doesn't include the counters, so it is used for the ticket dedup."""
+        return f"{self.level} [{self.logger_name}] {self.template}"
+
+    def summary(self) -> str:
+        """Text for the ticket note: the issue with its counters in the log."""
+        return f"{self.description}: {self.count} times in the log, first at {self.first_seen}, last at {self.last_seen}"
+
+
+class OtherLogIssues(LogIssue):
+    """Issues over the limit folded into one, so they are not lost but don't create a ticket each."""
+
+    def __init__(self, issues: tp.List[LogIssue]) -> None:
+        super().__init__(issues[0].level, "", "", min(issue.first_seen for issue in issues))
+        self.issues = issues
+        self.count = sum(issue.count for issue in issues)
+        self.last_seen = max(issue.last_seen for issue in issues)
+
+    @property
+    def description(self) -> str:
+        return "Other issues in the log"
+
+    def summary(self) -> str:
+        listed = [issue.summary() for issue in self.issues[:OTHER_ISSUES_IN_SUMMARY]]
+        if len(self.issues) > OTHER_ISSUES_IN_SUMMARY:
+            listed.append(f"and {len(self.issues) - OTHER_ISSUES_IN_SUMMARY} more")
+        return f"{self.description}: {len(self.issues)} issues, {self.count} times in the log\n" + "\n".join(listed)
+
+
+class LogAnalyzer:
+    """Streams the Home Assistant log line by line and groups the ERROR and WARNING entries by signature.
+    Only the signatures are kept, so the memory is constant for the logs of any size.
+    """
+
+    def __init__(self, max_signatures: int = LOG_ANALYZER_MAX_SIGNATURES) -> None:
+        self._max_signatures = max_signatures
+        self._issues: tp.Dict[tp.Tuple[str, str, str], LogIssue] = {}
+        self.lines = 0
+        self.dropped = 0
+
+    def feed(self, line: str) -> None:
+        """Processes one line of the log. Traceback and other continuation lines are skipped."""
+        self.lines += 1
+        match = _ENTRY_RE.match(line)
+        if match is None:
+            return
+        timestamp, level, logger_name, message = match.groups()
+        template = self.normalize(message)
+        signature = (level, logger_name, template)
+        issue = self._issues.get(signature)
+        if issue is None:
+            if len(self._issues) >= self._max_signatures:
+                self.dropped += 1
+                return
+            issue = self._issues[signature] = LogIssue(level, logger_name, template, timestamp)
+        issue.count += 1
+        issue.last_seen = timestamp
+
+    def issues(self, limit: tp.Optional[int] = None) -> tp.List[LogIssue]:
+        """Returns the issues, the most severe and frequent first. The issues over the limit are folded
+        into one `OtherLogIssues` at the end.
+        """
+        issues = sorted(self._issues.values(), key=lambda issue: (_LEVELS_ORDER[issue.level], -issue.count, issue.first_seen))
+        if limit is None or len(issues) <= limit:
+            return issues
+        return issues[:limit] + [OtherLogIssues(issues[limit:])]
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        """Replaces the variable parts of the message (strings, ids, addresses, numbers) with placeholders.
+        The unit suffixes of the numbers are kept: `1.5s` and `10s` are both `<num>s`.
+        """
+        template = _VARIABLE_RE.sub(lambda match: _PLACEHOLDERS[match.lastgroup], message.strip())
+        return template[:MAX_TEMPLATE_LENGTH]
+
+    @staticmethod
+    def analyze(binary_file: tp.BinaryIO, limit: tp.Optional[int] = LOG_ANALYZER_MAX_ISSUES) -> tp.List[LogIssue]:
+        """Analyzes the log from the binary file object. Too long lines are read in parts.
+        :param binary_file: Decrypted log, e.g. a reader of the report workspace file
+        :param limit: Max number of the issues to return
+
+        :return: Issues, the most severe and frequent first, and the `OtherLogIssues` if there are more than the limit
+        """
+        analyzer = LogAnalyzer()
+        text = io.TextIOWrapper(binary_file, encoding="utf-8", errors="replace", newline="")
+        try:
+            for line in iter(lambda: text.readline(MAX_LINE_LENGTH), ""):
+                analyzer.feed(line.rstrip("\r\n"))
+        finally:
+            text.detach()
+        return analyzer.issues(limit)
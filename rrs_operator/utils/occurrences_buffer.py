@@ -0,0 +1,156 @@
+import os
+import threading
+import typing as tp
+from datetime import datetime
+
+from dotenv import load_dotenv
+from tenacity import Retrying, wait_fixed
+
+from helpers.logger import Logger
+
+load_dotenv()
+OCCURRENCES_FLUSH_INTERVAL = float(os.getenv("OCCURRENCES_FLUSH_INTERVAL") or 30)
+OCCURRENCES_FLUSH_SIZE = int(os.getenv("OCCURRENCES_FLUSH_SIZE") or 100)
+# Max seconds `stop` waits for the flushing thread.
+OCCURRENCES_STOP_TIMEOUT = float(os.getenv("OCCURRENCES_STOP_TIMEOUT") or 30)
+# Odoo calls are retried until the buffer is stopped, after that only this number of attempts is made.
+OCCURRENCES_STOP_ATTEMPTS = 3
+OCCURRENCES_RETRY_DELAY = 5
+
+
+class OccurrencesBuffer:
+    """Write-behind buffer for occurrences of the problems in the existing tickets.
+    Accumulates the counter increments, the last occurred date and the new descriptions per ticket
+    and writes them to Odoo in one batch of writes on interval, when too many tickets are pending
+    or on shutdown.
+    """
+
+    def __init__(
+        self, odoo, flush_interval: float = OCCURRENCES_FLUSH_INTERVAL, flush_size: int = OCCURRENCES_FLUSH_SIZE
+    ) -> None:
+        """
+        :param odoo: Odoo for Operator
+        :param flush_interval: Seconds between the flushes
+        :param flush_size: Number of pending tickets that triggers the flush before the interval ends
+        """
+        self.odoo = odoo
+        self._logger = Logger("occurrences-buffer")
+        self._flush_interval = flush_interval
+        self._flush_size = flush_size
+        self._pending: tp.Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, ticket_id: int, description: str) -> None:
+        """Registers one more occurrence of the problem in the ticket.
+        :param ticket_id: Id of the existing ticket
+        :param description: Problem's description from the report
+        """
+        with self._lock:
+            occurrence = self._pending.setdefault(ticket_id, {"count": 0, "last_occurred": None, "descriptions": []})
+            occurrence["count"] += 1
+            occurrence["last_occurred"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if description not in occurrence["descriptions"]:
+                occurrence["descriptions"].append(description)
+            pending_tickets = len(self._pending)
+        if pending_tickets >= self._flush_size:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """Writes all pending occurrences to Odoo: one read for all the tickets and the writes in one batch.
+        The occurrences which were not written because of an error are put back to the buffer.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            self._logger.debug(f"Flushing occurrences for {len(pending)} tickets...")
+            try:
+                tickets = self._call_odoo(self.odoo.read_tickets, list(pending), ["count", "description"])
+                updates = {}
+                for ticket_id, occurrence in list(pending.items()):
+                    ticket = tickets.get(ticket_id)
+                    if ticket is None:
+                        self._logger.debug(f"Ticket {ticket_id} doesn't exist anymore, skipping")
+                        del pending[ticket_id]
+                    else:
+                        updates[ticket_id] = self._get_ticket_update(ticket, occurrence)
+                self._call_odoo(self._update_tickets, updates, pending)
+            except Exception:
+                self._restore(pending)
+                raise
+
+    def stop(self) -> None:
+        """Stops the flushing thread and writes the rest of the occurrences.
+        Doesn't hang if Odoo is down: the calls are retried only a few times after the stop.
+        """
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(OCCURRENCES_STOP_TIMEOUT)
+        if self._thread.is_alive():
+            self._logger.error(f"Flushing thread didn't stop in {OCCURRENCES_STOP_TIMEOUT} sec, occurrences for {len(self._pending)} tickets are not written")
+            return
+        try:
+            self.flush()
+        except Exception as e:
+            self._logger.error(f"Couldn't flush occurrences for {len(self._pending)} tickets on stop: {e}")
+
+    def _call_odoo(self, method: tp.Callable, *args) -> tp.Any:
+        """Calls the Odoo method and retries it on errors, until the buffer is stopped."""
+        retrying = Retrying(wait=wait_fixed(OCCURRENCES_RETRY_DELAY), stop=self._should_stop_retrying, reraise=True)
+        return retrying(method, *args)
+
+    def _update_tickets(self, updates: tp.Dict[int, dict], pending: tp.Dict[int, dict]) -> None:
+        """Writes the updates and removes the written tickets from both dicts, so a retry writes only the failed ones."""
+        errors = self.odoo.update_tickets(updates)
+        for ticket_id in list(updates):
+            if ticket_id not in errors:
+                del updates[ticket_id]
+                del pending[ticket_id]
+        if errors:
+            raise Exception(f"Couldn't update {len(errors)} tickets")
+
+    def _should_stop_retrying(self, retry_state) -> bool:
+        return self._stopped and retry_state.attempt_number >= OCCURRENCES_STOP_ATTEMPTS
+
+    def _restore(self, pending: tp.Dict[int, dict]) -> None:
+        """Puts the not written occurrences back, merged with the ones added during the flush."""
+        with self._lock:
+            for ticket_id, occurrence in pending.items():
+                current = self._pending.get(ticket_id)
+                if current is None:
+                    self._pending[ticket_id] = occurrence
+                    continue
+                current["count"] += occurrence["count"]
+                new_descriptions = [description for description in current["descriptions"] if description not in occurrence["descriptions"]]
+                current["descriptions"] = occurrence["descriptions"] + new_descriptions
+
+    def _get_ticket_update(self, ticket: dict, occurrence: dict) -> dict:
+        data = {
+            "count": int(ticket["count"]) + occurrence["count"],
+            "last_occurred": occurrence["last_occurred"],
+        }
+        current_description = ticket["description"] or ""
+        description = current_description
+        for new_description in occurrence["descriptions"]:
+            if new_description not in description:
+                description = f"{description} {new_description}"
+        if description != current_description:
+            data["description"] = description
+        return data
+
+    def _run(self) -> None:
+        while not self._stopped:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            if self._stopped:
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                self._logger.error(f"Couldn't flush occurrences: {e}")
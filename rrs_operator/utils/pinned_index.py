@@ -0,0 +1,58 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import typing as tp
+
+from dotenv import load_dotenv
+
+load_dotenv()
+PINNED_INDEX_PATH = os.getenv("PINNED_INDEX_PATH") or "pinned_index.sqlite3"
+HASHING_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(file: tp.Union[str, tp.BinaryIO]) -> str:
+    """Sha256 of the file content, read in chunks.
+    :param file: Path to the file or seekable binary file object, the object is rewound after reading
+    """
+    if isinstance(file, str):
+        with open(file, "rb") as f:
+            return file_digest(f)
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASHING_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class PinnedIndex:
+    """Local persistent index content sha256 -> CID of the files pinned to the IPFS node,
+    used to skip uploading the content the node already has.
+    """
+
+    def __init__(self, path: str = PINNED_INDEX_PATH) -> None:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS pinned (digest TEXT PRIMARY KEY, cid TEXT NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS pinned_cid ON pinned (cid)")
+
+    def get_many(self, digests: tp.List[str]) -> tp.Dict[str, str]:
+        """Returns dict digest -> CID for the digests found in the index."""
+        digests = list(set(digests))
+        if not digests:
+            return {}
+        placeholders = ",".join("?" * len(digests))
+        with self._lock:
+            rows = self._db.execute(f"SELECT digest, cid FROM pinned WHERE digest IN ({placeholders})", digests).fetchall()
+        return dict(rows)
+
+    def add(self, digest: str, cid: str) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO pinned (digest, cid) VALUES (?, ?)", (digest, cid))
+
+    def remove_cid(self, cid: str) -> None:
+        """Removes the CID from the index, e.g. when it is unpinned."""
+        with self._lock:
+            self._db.execute("DELETE FROM pinned WHERE cid = ?", (cid,))
@@ -0,0 +1,22 @@
+import typing as tp
+
+from rrs_operator.utils.log_analyzer import LogIssue
+from rrs_operator.utils.workspace import Workspace
+
+
+class ReportContext:
+    """State of one report going through the pipeline. The long-lived helpers (Odoo, IPFS, ChatGPT)
+    are shared between the reports, everything collected for a single report lives here.
+    """
+
+    def __init__(self, sender_address: str) -> None:
+        self.sender_address = sender_address
+        self.workspace = Workspace()
+        self.logs_hashes: tp.List[str] = []
+        self.issue: tp.Optional[dict] = None
+        self.log_issues: tp.List[LogIssue] = []
+        self.unique_tickets: tp.Dict[int, str] = {}
+
+    def cleanup(self) -> None:
+        """Frees the report files. Safe to call several times."""
+        self.workspace.cleanup()
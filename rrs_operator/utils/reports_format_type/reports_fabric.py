@@ -1,4 +1,4 @@
-import json
+import typing as tp
 
 from .src import Report
 from .src import NoLogs, LogsDict, SingleHash
@@ -6,11 +6,12 @@ from .src import NoLogs, LogsDict, SingleHash
 class ReportsFormatTypeFabric:
 
     @staticmethod
-    def get_report(report_msg: str, ipfs, logger) -> Report:
-        try:
-            report_dict = json.loads(report_msg)
-            if "home-assistant.log" in report_dict:
+    def get_report(report: tp.Union[dict, str], ipfs, logger) -> Report:
+        """
+        :param report: Parsed report from the frame: dict with the files or hash of the directory with the files
+        """
+        if isinstance(report, dict):
+            if "home-assistant.log" in report:
                 return LogsDict(logger=logger, ipfs=ipfs)
             return NoLogs(logger=logger)
-        except json.decoder.JSONDecodeError:
-            return SingleHash(logger=logger, ipfs=ipfs)
+        return SingleHash(logger=logger, ipfs=ipfs)
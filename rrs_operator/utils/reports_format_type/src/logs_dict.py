@@ -1,8 +1,9 @@
 from tenacity import *
-import json
+import asyncio
 
 from .report import Report
 from helpers.logger import Logger
+from rrs_operator.utils.report_context import ReportContext
 from helpers.pinata import PinataHelper
 from rrs_operator.utils.hash_cash import HashCache
 
@@ -13,21 +14,23 @@ class LogsDict(Report):
         self.ipfs = ipfs
 
     @retry(wait=wait_fixed(10))
-    def handle_report(self, report_msg: str, sender_address: str, temp_dir: str):
+    def handle_report(self, dict_with_logs: dict, sender_address: str, context: ReportContext):
         self._logger.debug("Handling logs-dict report.")
         try:
-            dict_with_logs = json.loads(report_msg)
-            hashes = []
-            for k, v in dict_with_logs.items():
-                encrypted_content = PinataHelper.download_file(hash=v, logger=self._logger)
-                path_to_saved_file = self.save_decrypted_logs(encrypted_content=encrypted_content, file_name=k, sender_address=sender_address, temp_dir=temp_dir)
-                hashes.append(v)
-                if not(k == self.DESCRIPTION_FILE_NAME):
-                    self._logger.debug(f"Pinning file {path_to_saved_file} to the IPFS node...")
-                    self.ipfs.pin_file(path_to_saved_file)
-            HashCache.store_hashes(sender_address, hashes)
+            encrypted_files = PinataHelper.spool_files(dict_with_logs, context.workspace.new_file, self._logger)
+            self.save_and_pin_encrypted_files(encrypted_files, sender_address, context)
+            HashCache.store_hashes(sender_address, list(dict_with_logs.values()))
         except Exception as e:
             self._logger.error(f"Error while handling json report: {e}")
             raise e
 
-
+    @retry(wait=wait_fixed(10))
+    async def handle_report_async(self, dict_with_logs: dict, sender_address: str, context: ReportContext, gateway):
+        self._logger.debug("Handling logs-dict report.")
+        try:
+            encrypted_files = await gateway.spool_files(dict_with_logs, context.workspace.new_file, self._logger)
+            await asyncio.to_thread(self.save_and_pin_encrypted_files, encrypted_files, sender_address, context)
+            HashCache.store_hashes(sender_address, list(dict_with_logs.values()))
+        except Exception as e:
+            self._logger.error(f"Error while handling json report: {e}")
+            raise e
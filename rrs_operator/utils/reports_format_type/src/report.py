@@ -1,17 +1,80 @@
+import asyncio
+import json
+import typing as tp
 from abc import ABC, abstractmethod
-from utils.decryption import decrypt_message
-from rrs_operator.utils.files_helper import FilesHelper
+from utils.decryption import decrypt_contents, decrypt_message, decrypt_files
 
 
 class Report(ABC):
     def __init__(self) -> None:
         self.DESCRIPTION_FILE_NAME = "issue_description.json"
+        self.ipfs = None
 
     @abstractmethod
-    def handle_report(self, report_msg: str) -> None:
+    def handle_report(self, report: tp.Union[dict, str], sender_address: str, context) -> None:
+        """Gets the files of the report: puts the decrypted issue description to `context.issue`,
+        pins the logs and puts their hashes to `context.logs_hashes`.
+        :param report: Parsed report from the frame
+        """
         pass
 
-    def save_decrypted_logs(self, encrypted_content: str, file_name: str, sender_address: str, temp_dir: str):
-        decrypted_content = decrypt_message(encrypted_content, sender_address, self._logger)
-        path_to_saved_file = FilesHelper.create_and_save_file(decrypted_content, temp_dir, file_name)
-        return path_to_saved_file
+    async def handle_report_async(self, report: tp.Union[dict, str], sender_address: str, context, gateway) -> None:
+        """Async version of `handle_report`. Runs the blocking handler in a thread if a report type doesn't override it.
+        :param gateway: AsyncPinataHelper to download the files with
+        """
+        await asyncio.to_thread(self.handle_report, report, sender_address, context)
+
+    def decrypt_issue(self, encrypted_description: tp.Union[str, dict], sender_address: str) -> dict:
+        """Decrypts the issue description in memory, it is not pinned, so it is never written to the disk."""
+        decrypted_description = decrypt_message(encrypted_description, sender_address, self._logger)
+        if decrypted_description is None:
+            raise Exception("Couldn't decrypt issue description")
+        return json.loads(decrypted_description)
+
+    def save_and_pin_encrypted_files(self, encrypted_files: dict, sender_address: str, context) -> None:
+        """Decrypts the issue description to `context.issue` in memory. Decrypts the other downloaded files
+        to the report workspace and pins them to the IPFS node with one call straight from the buffers.
+        Files kept in memory are decrypted in memory, only the files spilled to the disk are decrypted by path.
+        The encrypted files are discarded after decryption.
+        :param encrypted_files: Dict file name -> spooled file with the encrypted content or None if the file was not found
+        """
+        description_file = encrypted_files.get(self.DESCRIPTION_FILE_NAME)
+        if description_file is not None:
+            encrypted_description = description_file.getvalue().decode("utf-8")
+            description_file.discard()
+            context.issue = self.decrypt_issue(encrypted_description, sender_address)
+        files = {
+            file_name: encrypted_file
+            for file_name, encrypted_file in encrypted_files.items()
+            if encrypted_file is not None and file_name != self.DESCRIPTION_FILE_NAME
+        }
+        in_memory = {}
+        on_disk = {}
+        for file_name, encrypted_file in files.items():
+            if encrypted_file.in_memory:
+                in_memory[file_name] = encrypted_file.getvalue()
+                encrypted_file.discard()
+            else:
+                on_disk[file_name] = (encrypted_file.ensure_path(), context.workspace.new_path(file_name))
+        decrypted_contents = decrypt_contents(in_memory, sender_address, self._logger)
+        in_memory.clear()
+        decrypted_on_disk = decrypt_files(on_disk, sender_address, self._logger)
+        for encrypted_file in files.values():
+            encrypted_file.discard()
+        not_decrypted = [file_name for file_name, content in decrypted_contents.items() if content is None]
+        not_decrypted += [file_name for file_name, success in decrypted_on_disk.items() if not success]
+        if not_decrypted:
+            raise Exception(f"Couldn't decrypt files {not_decrypted}")
+        decrypted_files = [
+            context.workspace.put_bytes(file_name, decrypted_contents.pop(file_name))
+            if file_name in decrypted_contents
+            else context.workspace.put_path(file_name, on_disk[file_name][1])
+            for file_name in files
+        ]
+        self._logger.debug(f"Pinning files {list(files)} to the IPFS node...")
+        readers = [decrypted_file.reader() for decrypted_file in decrypted_files]
+        try:
+            context.logs_hashes.extend(self.ipfs.pin_files(readers))
+        finally:
+            for reader in readers:
+                reader.close()
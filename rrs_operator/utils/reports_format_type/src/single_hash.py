@@ -1,7 +1,9 @@
 from tenacity import *
+import asyncio
 
 from .report import Report
 from helpers.logger import Logger
+from rrs_operator.utils.report_context import ReportContext
 from helpers.pinata import PinataHelper
 
 logs_name = ["issue_description.json", "home-assistant.log", "trace.saved_traces"]
@@ -13,11 +15,13 @@ class SingleHash(Report):
         self.ipfs = ipfs
 
     @retry(wait=wait_fixed(10))
-    def handle_report(self, report_msg: str, sender_address: str, temp_dir: str):
+    def handle_report(self, hash: str, sender_address: str, context: ReportContext):
         self._logger.debug("Handling single hash report.")
-        for log in logs_name:
-            encrypted_content = PinataHelper.download_file_from_directory(hash=report_msg, logger=self._logger, file_name=log)
-            path_to_saved_file = self.save_decrypted_logs(encrypted_content=encrypted_content, file_name=log, sender_address=sender_address, temp_dir=temp_dir)
-            if not(log == self.DESCRIPTION_FILE_NAME):
-                self._logger.debug(f"Pinning file {path_to_saved_file} to the IPFS node...")
-                self.ipfs.pin_file(path_to_saved_file)
+        encrypted_files = PinataHelper.spool_files_from_directory(hash, logs_name, context.workspace.new_file, self._logger)
+        self.save_and_pin_encrypted_files(encrypted_files, sender_address, context)
+
+    @retry(wait=wait_fixed(10))
+    async def handle_report_async(self, hash: str, sender_address: str, context: ReportContext, gateway):
+        self._logger.debug("Handling single hash report.")
+        encrypted_files = await gateway.spool_files_from_directory(hash, logs_name, context.workspace.new_file, self._logger)
+        await asyncio.to_thread(self.save_and_pin_encrypted_files, encrypted_files, sender_address, context)
@@ -1,3 +1,5 @@
+import typing as tp
+
 from .src import ErrorsReport, Report, UnrespondedDevicesReport, WarningsReport
 
 
@@ -5,7 +7,11 @@ class ReportsProblemTypeFabric:
     """Fabric to select Report based on its type"""
 
     @staticmethod
-    def get_report(issue: dict) -> Report:
+    def get_report(issue: dict, log_issues: tp.Optional[list] = None) -> Report:
+        """
+        :param issue: Decrypted issue description
+        :param log_issues: Issues found in the Home Assistant log of the report, see `LogAnalyzer`
+        """
         if isinstance(issue['description'], dict):
             type = issue["description"]["type"]
             unparsed_description = issue["description"]["description"]
@@ -13,7 +19,7 @@ class ReportsProblemTypeFabric:
             type = "errors"
             unparsed_description = issue["description"]
         if type == "warnings":
-            return WarningsReport(unparsed_description)
+            return WarningsReport(unparsed_description, log_issues)
         if type == "errors":
             return ErrorsReport(unparsed_description)
         if type == "unresponded_devices":
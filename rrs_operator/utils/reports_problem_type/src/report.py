@@ -1,9 +1,11 @@
+import typing as tp
 from abc import ABC, abstractmethod
 
 
 class Report(ABC):
-    def __init__(self, unparsed_description: str):
+    def __init__(self, unparsed_description: str, log_issues: tp.Optional[list] = None):
         self.unparsed_description = unparsed_description
+        self.log_issues = log_issues or []
 
     @abstractmethod
     def get_descriptions(self) -> list:
@@ -3,8 +3,10 @@ from .report import Report
 
 class WarningsReport(Report):
     def get_descriptions(self) -> list:
+        """Warnings listed in the description and the distinct issues found in the log if the report has it."""
         warnigns = self.unparsed_description.split("*")
-        return warnigns
+        log_descriptions = [issue.description for issue in self.log_issues if issue.description not in warnigns]
+        return warnigns + log_descriptions
 
     def get_priority(self) -> str:
         return "1"
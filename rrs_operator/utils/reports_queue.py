@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import threading
+import time
+import typing as tp
+
+from dotenv import load_dotenv
+
+load_dotenv()
+REPORTS_QUEUE_PATH = os.getenv("REPORTS_QUEUE_PATH") or "reports_queue.sqlite3"
+REPORTS_VISIBILITY_TIMEOUT = float(os.getenv("REPORTS_VISIBILITY_TIMEOUT") or 900)
+REPORTS_MAX_ATTEMPTS = int(os.getenv("REPORTS_MAX_ATTEMPTS") or 5)
+
+
+class ReportsQueue:
+    """Durable queue of the inbound report frames in SQLite (WAL).
+    A taken report becomes invisible for the visibility timeout, the consumer keeps it invisible with `extend`
+    while it processes the report. It is deleted with `ack` after the response is sent, otherwise it is delivered
+    again: after `release`, when the timeout expires or when the queue is opened again after a crash.
+    The queue has one consumer process, so all the reports taken before the restart are made visible on open.
+    Reports of one sender are delivered one by one: a report is not taken while an older report of its sender
+    is taken or waits for a retry.
+    At most `max_size` reports are waiting or taken, `put` waits for a free slot when the queue is full.
+    """
+
+    def __init__(
+        self,
+        path: str = REPORTS_QUEUE_PATH,
+        visibility_timeout: float = REPORTS_VISIBILITY_TIMEOUT,
+        max_attempts: int = REPORTS_MAX_ATTEMPTS,
+        max_size: tp.Optional[int] = None,
+    ) -> None:
+        """
+        :param path: Path to the SQLite database
+        :param visibility_timeout: Seconds a taken report stays invisible before it is delivered again
+        :param max_attempts: Reports taken that many times without ack are kept in the database as failed
+        and not delivered anymore
+        :param max_size: Optional: Max number of the waiting and taken reports. Not limited if None.
+        """
+        self._visibility_timeout = visibility_timeout
+        self._max_attempts = max_attempts
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sender TEXT NOT NULL,
+                message TEXT NOT NULL,
+                visible_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                response TEXT
+            )"""
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(reports)")]
+        if "response" not in columns:
+            self._db.execute("ALTER TABLE reports ADD COLUMN response TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS reports_visible_at ON reports (visible_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS reports_sender ON reports (sender, id)")
+        # Nobody processes the reports taken by the previous process, they would block their senders until the timeout.
+        now = time.time()
+        self._db.execute("UPDATE reports SET visible_at = ? WHERE visible_at > ?", (now, now))
+
+    def put(self, sender: str, message: str, timeout: tp.Optional[float] = None) -> tp.Optional[int]:
+        """Stores the report frame. Waits while the queue is full.
+        :param timeout: Max seconds to wait for a free slot. Waits forever if None.
+
+        :return: Id of the queued report or None if the queue was full for the whole timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._not_empty:
+            while self._max_size is not None and self._depth() >= self._max_size:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._not_full.wait(remaining)
+            cursor = self._db.execute(
+                "INSERT INTO reports (sender, message, visible_at) VALUES (?, ?, ?)", (sender, message, time.time())
+            )
+            self._not_empty.notify()
+            return cursor.lastrowid
+
+    def take(self, timeout: tp.Optional[float] = None) -> tp.Optional[tp.Tuple[int, str, str, tp.Optional[str]]]:
+        """Takes the oldest visible report of a sender without older unacked reports and hides it
+        for the visibility timeout.
+        :param timeout: Max seconds to wait for a report. Waits forever if None.
+
+        :return: Tuple (id, sender, message, response) or None if there were no reports in time.
+        The response is not None if the report was processed before, but the response wasn't sent.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._not_empty:
+            while True:
+                now = time.time()
+                row = self._db.execute(
+                    """SELECT id, sender, message, attempts, response FROM reports AS report
+                    WHERE visible_at <= ? AND NOT EXISTS (
+                        SELECT 1 FROM reports AS older
+                        WHERE older.sender = report.sender AND older.id < report.id AND older.visible_at IS NOT NULL
+                    )
+                    ORDER BY id LIMIT 1""",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    report_id, sender, message, attempts, response = row
+                    if attempts >= self._max_attempts:
+                        self._db.execute("UPDATE reports SET visible_at = NULL WHERE id = ?", (report_id,))
+                        self._not_full.notify()
+                        continue
+                    self._db.execute(
+                        "UPDATE reports SET visible_at = ?, attempts = attempts + 1 WHERE id = ?",
+                        (now + self._visibility_timeout, report_id),
+                    )
+                    return report_id, sender, message, response
+                wait = self._seconds_to_next_visible(now)
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._not_empty.wait(wait)
+
+    def extend(self, report_ids: tp.Iterable[int]) -> None:
+        """Keeps the taken reports invisible for one more visibility timeout, while they are still processed."""
+        report_ids = list(report_ids)
+        if not report_ids:
+            return
+        placeholders = ",".join("?" * len(report_ids))
+        with self._lock:
+            self._db.execute(
+                f"UPDATE reports SET visible_at = ? WHERE id IN ({placeholders}) AND visible_at IS NOT NULL",
+                (time.time() + self._visibility_timeout, *report_ids),
+            )
+
+    def save_response(self, report_id: int, response: str) -> None:
+        """Stores the response of the processed report. If sending it fails, only the response is sent again
+        on the next delivery, the report is not processed twice.
+        """
+        with self._lock:
+            self._db.execute("UPDATE reports SET response = ? WHERE id = ?", (response, report_id))
+
+    def ack(self, report_id: int) -> None:
+        """Deletes the processed report. The next report of the sender can be taken after that."""
+        with self._not_empty:
+            self._db.execute("DELETE FROM reports WHERE id = ?", (report_id,))
+            self._not_empty.notify_all()
+            self._not_full.notify()
+
+    def release(self, report_id: int, delay: float = 0) -> None:
+        """Makes the report visible again after the delay, e.g. when it failed and should be retried."""
+        with self._not_empty:
+            self._db.execute("UPDATE reports SET visible_at = ? WHERE id = ?", (time.time() + delay, report_id))
+            self._not_empty.notify_all()
+
+    def stats(self) -> tp.Dict[str, int]:
+        """Returns the number of waiting, taken and failed reports and the max number of the waiting and taken ones."""
+        now = time.time()
+        with self._lock:
+            waiting, taken, failed = self._db.execute(
+                """SELECT
+                    COALESCE(SUM(visible_at <= ?), 0),
+                    COALESCE(SUM(visible_at > ?), 0),
+                    COALESCE(SUM(visible_at IS NULL), 0)
+                FROM reports""",
+                (now, now),
+            ).fetchone()
+        return {"waiting": waiting, "taken": taken, "failed": failed, "max_size": self._max_size}
+
+    def _depth(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM reports WHERE visible_at IS NOT NULL").fetchone()[0]
+
+    def _seconds_to_next_visible(self, now: float) -> tp.Optional[float]:
+        row = self._db.execute("SELECT MIN(visible_at) FROM reports WHERE visible_at > ?", (now,)).fetchone()
+        return row[0] - now if row[0] is not None else None
@@ -1,34 +1,54 @@
+import asyncio
 import typing as tp
 from helpers.logger import Logger
 from rrs_operator.src.open_ai import ChatGPT
+from rrs_operator.utils.occurrences_buffer import OccurrencesBuffer
+from rrs_operator.utils.report_context import ReportContext
+from rrs_operator.utils.tickets_index import TicketsIndex, ticket_fingerprint
 
 class TicketManager:
-    def __init__(self, odoo) -> None:
+    """Created once and shared by the workers. Tickets created for a report are kept in its `ReportContext`."""
+
+    def __init__(self, odoo, tickets_index: TicketsIndex, occurrences: OccurrencesBuffer) -> None:
         self.odoo = odoo
+        self.tickets_index = tickets_index
+        self.occurrences = occurrences
         self._logger = Logger("ticket-manager")
-        self.unique_tickets = {}
         self.chatGPT = ChatGPT()
     
-    def process_ticket(self, descriptions_list, priority, source: str, email: str, sender_address: str, logs_hashes):
+    def process_ticket(self, context: ReportContext, descriptions_list, priority, source: str, email: str, logs_hashes):
+        sender_address = context.sender_address
         ticket_ids = []
+        notes = []
+        summaries = []
         paid_service = self.odoo.is_paid(sender_address)
+        existing_tickets = self._find_existing_tickets(descriptions_list, email, source)
+        # Counters of the issues found in the log. The descriptions are stable for the dedup, the counters go to the notes.
+        log_summaries = {issue.description: issue.summary() for issue in context.log_issues}
         for description in descriptions_list:
-            ticket_id = self._find_existing_ticket(description, email, source)
+            ticket_id = self._find_existing_ticket(description, email, source, existing_tickets)
             if ticket_id:
                 self._update_existing_ticket(ticket_id, description)
             else:
                 ticket_id = self.odoo.create_ticket(email, sender_address, description, priority, source)
-                self.unique_tickets[ticket_id] = description
+                context.unique_tickets[ticket_id] = description
+                if ticket_id:
+                    fingerprint = self._fingerprint(description, email, source)
+                    existing_tickets[fingerprint] = ticket_id
+                    self.tickets_index.add(fingerprint, ticket_id)
 
             ticket_ids.append(ticket_id)
+            if description in log_summaries:
+                summaries.append((ticket_id, log_summaries[description]))
             if logs_hashes:
                 for hash in logs_hashes:
-                    self.odoo.create_note_with_logs_hash(ticket_id, hash)
+                    notes.append((ticket_id, hash))
+        self.odoo.create_notes_with_logs_hashes(notes, summaries)
         return ticket_ids, paid_service
 
-    def generate_and_save_solution(self, email: str):
-        self._logger.debug(f"tickets: {self.unique_tickets}")
-        for ticket_id, description in self.unique_tickets.items():
+    def generate_and_save_solution(self, context: ReportContext, email: str):
+        self._logger.debug(f"tickets: {context.unique_tickets}")
+        for ticket_id, description in context.unique_tickets.items():
             if not description.strip():
                 self._logger.debug(f"Skipping empty ticket {ticket_id}")
             else:
@@ -36,20 +56,52 @@ class TicketManager:
                 self.odoo.save_chatgpt_solution_to_notes(int(ticket_id), response)
                 self.odoo.create_email_with_chatgpt_solution(response, email, int(ticket_id))
 
+    async def generate_and_save_solution_async(self, context: ReportContext, email: str, chat_gpt):
+        """Async version of `generate_and_save_solution`: asks ChatGPT for all the tickets at once.
+        :param chat_gpt: AsyncChatGPT client
+        """
+        self._logger.debug(f"tickets: {context.unique_tickets}")
+        tickets = [(ticket_id, description) for ticket_id, description in context.unique_tickets.items() if description.strip()]
+        responses = await asyncio.gather(*(chat_gpt.generate_response(description) for _, description in tickets))
+        for (ticket_id, _), response in zip(tickets, responses):
+            await asyncio.to_thread(self.odoo.save_chatgpt_solution_to_notes, int(ticket_id), response)
+            await asyncio.to_thread(self.odoo.create_email_with_chatgpt_solution, response, email, int(ticket_id))
+
 
-    def _find_existing_ticket(self, description: str, email: str, source: str) -> tp.Optional[int]:
-        if (source == "devices") or (source == ""):
-            ticket_id = self.odoo.find_ticket_with_description(description, email)
+    def _find_existing_tickets(self, descriptions_list: list, email: str, source: str) -> tp.Dict[str, int]:
+        """Looks for open tickets for all the descriptions of the report at once. The local index is checked first,
+        Odoo is searched only for the descriptions missing in the index.
+
+        :return: Dict fingerprint -> ticket id, see `_fingerprint`
+        """
+        fingerprints = {description: self._fingerprint(description, email, source) for description in descriptions_list}
+        existing_tickets = self.tickets_index.get_many(list(fingerprints.values()))
+        missing = [description for description, fingerprint in fingerprints.items() if fingerprint not in existing_tickets]
+        if not missing:
+            return existing_tickets
+        self._logger.debug(f"{len(missing)} descriptions are not in the tickets index, searching in Odoo...")
+        if self._is_matched_by_description(source):
+            found_tickets = self.odoo.find_tickets_with_descriptions(missing, email)
         else:
             ticket_id = self.odoo.find_ticket_with_source(source, email)
-        return ticket_id
+            found_tickets = {description: ticket_id for description in missing} if ticket_id else {}
+        for description, ticket_id in found_tickets.items():
+            existing_tickets[fingerprints[description]] = ticket_id
+            self.tickets_index.add(fingerprints[description], ticket_id)
+        return existing_tickets
+
+    def _find_existing_ticket(self, description: str, email: str, source: str, existing_tickets: tp.Dict[str, int]) -> tp.Optional[int]:
+        return existing_tickets.get(self._fingerprint(description, email, source))
+
+    def _fingerprint(self, description: str, email: str, source: str) -> str:
+        """All problems from the same source go to one ticket, other problems are matched by the description."""
+        if self._is_matched_by_description(source):
+            return ticket_fingerprint(email, source, description)
+        return ticket_fingerprint(email, source, "")
+
+    @staticmethod
+    def _is_matched_by_description(source: str) -> bool:
+        return (source == "devices") or (source == "")
     
     def _update_existing_ticket(self, ticket_id: int, description: str):
-        self.odoo.get_and_increase_problem_counter(ticket_id)
-        self.odoo.set_last_occurred(ticket_id)
-        current_description = self.odoo.get_description_from_ticket(ticket_id)
-        if description in current_description:
-            self._logger.debug(f"New descritpion is the same")
-        else:
-            self._logger.debug("New description is not the same. Adding to the ticket...")
-            self.odoo.get_and_update_description(ticket_id, description)
\ No newline at end of file
+        self.occurrences.add(ticket_id, description)
\ No newline at end of file
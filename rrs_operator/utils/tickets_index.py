@@ -0,0 +1,83 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import typing as tp
+
+from dotenv import load_dotenv
+
+load_dotenv()
+TICKETS_INDEX_PATH = os.getenv("TICKETS_INDEX_PATH") or "tickets_index.sqlite3"
+
+_TIMESTAMP_RE = re.compile(
+    r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?|\b\d{2}:\d{2}:\d{2}(\.\d+)?\b"
+)
+_ID_RE = re.compile(
+    r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"
+    r"|\b[0-9A-HJKMNP-TV-Z]{26}\b"
+    r"|\b(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{16,}\b"
+)
+_NUMBER_RE = re.compile(r"\d+(\.\d+)?")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_description(description: str) -> str:
+    """Strips the parts of the description that change from one occurrence to another:
+    timestamps, generated ids (uuid, ulid, hex) and numbers.
+
+    :param description: Problem's description from the report
+
+    :return: Normalized description
+    """
+    description = _TIMESTAMP_RE.sub("<ts>", description)
+    description = _ID_RE.sub("<id>", description)
+    description = _NUMBER_RE.sub("<n>", description)
+    return _SPACES_RE.sub(" ", description).strip().lower()
+
+
+def ticket_fingerprint(email: str, source: str, description: str) -> str:
+    """Fingerprint of the problem used to find the ticket it belongs to."""
+    key = "\x1f".join((email or "", str(source or ""), normalize_description(description or "")))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+class TicketsIndex:
+    """Local persistent index fingerprint -> open ticket id, used to find duplicates
+    without searching the ticket descriptions in Odoo.
+    """
+
+    def __init__(self, path: str = TICKETS_INDEX_PATH) -> None:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS tickets (fingerprint TEXT PRIMARY KEY, ticket_id INTEGER NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS tickets_ticket_id ON tickets (ticket_id)")
+
+    def get(self, fingerprint: str) -> tp.Optional[int]:
+        with self._lock:
+            row = self._db.execute("SELECT ticket_id FROM tickets WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, fingerprints: tp.List[str]) -> tp.Dict[str, int]:
+        """Returns dict fingerprint -> ticket id for the fingerprints found in the index."""
+        fingerprints = list(set(fingerprints))
+        if not fingerprints:
+            return {}
+        placeholders = ",".join("?" * len(fingerprints))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT fingerprint, ticket_id FROM tickets WHERE fingerprint IN ({placeholders})", fingerprints
+            ).fetchall()
+        return dict(rows)
+
+    def add(self, fingerprint: str, ticket_id: int) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tickets (fingerprint, ticket_id) VALUES (?, ?)", (fingerprint, int(ticket_id))
+            )
+
+    def remove_ticket(self, ticket_id: int) -> None:
+        """Removes the ticket from the index, e.g. when the ticket is done or deleted."""
+        with self._lock:
+            self._db.execute("DELETE FROM tickets WHERE ticket_id = ?", (int(ticket_id),))
@@ -0,0 +1,166 @@
+import io
+import os
+import tempfile
+import threading
+import typing as tp
+
+from dotenv import load_dotenv
+
+from rrs_operator.utils.files_helper import FilesHelper
+
+load_dotenv()
+WORKSPACE_SPOOL_SIZE = int(os.getenv("WORKSPACE_SPOOL_SIZE") or 1024 * 1024)
+
+
+class SpooledFile:
+    """File of the report kept in memory. When it grows over the spool size it is moved to the
+    workspace directory and written there, so only big files touch the disk.
+    """
+
+    def __init__(self, name: tp.Optional[str], spool_size: int, get_directory: tp.Callable[[], str]) -> None:
+        self.name = name
+        self.path: tp.Optional[str] = None
+        self.size = 0
+        self._spool_size = spool_size
+        self._get_directory = get_directory
+        self._buffer: tp.Optional[io.BytesIO] = io.BytesIO()
+        self._file: tp.Optional[tp.BinaryIO] = None
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+
+    def write(self, data: bytes) -> int:
+        if self.in_memory and self.size + len(data) > self._spool_size:
+            self._spill()
+        if self.in_memory:
+            self._buffer.write(data)
+        else:
+            self._file.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def getvalue(self) -> bytes:
+        """Returns the whole content. Reads the file if it was spilled to the disk."""
+        if self.in_memory:
+            return self._buffer.getvalue()
+        self._close_file()
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def reader(self) -> tp.BinaryIO:
+        """Returns a new binary reader at the beginning of the content. The reader has the `name` of the file."""
+        if self.in_memory:
+            reader = io.BytesIO(self._buffer.getbuffer())
+            reader.name = self.name or ""
+            return reader
+        self._close_file()
+        return open(self.path, "rb")
+
+    def ensure_path(self) -> str:
+        """Moves the content to the disk if it is in memory, for the tools that need a path."""
+        if self.in_memory:
+            self._spill()
+        self._close_file()
+        return self.path
+
+    def discard(self) -> None:
+        """Frees the memory and removes the file from the disk. Safe to call several times."""
+        self._buffer = None
+        self._close_file()
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    @classmethod
+    def from_path(cls, name: str, path: str, spool_size: int, get_directory: tp.Callable[[], str]) -> "SpooledFile":
+        """Wraps the file already written to the workspace directory."""
+        spooled_file = cls(name, spool_size, get_directory)
+        spooled_file._buffer = None
+        spooled_file.path = path
+        spooled_file.size = os.path.getsize(path)
+        return spooled_file
+
+    def _spill(self) -> None:
+        fd, self.path = _mkstemp(self._get_directory(), self.name)
+        self._file = os.fdopen(fd, "wb")
+        self._file.write(self._buffer.getbuffer())
+        self._buffer = None
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _mkstemp(directory: str, name: tp.Optional[str]) -> tp.Tuple[int, str]:
+    return tempfile.mkstemp(dir=directory, prefix=f"{name or 'file'}.")
+
+
+class Workspace:
+    """Files of one report. The files live in memory and spill to a temporary directory only when they are big.
+    The directory is created on the first spill, so small reports do no filesystem I/O.
+    `cleanup` frees all the files deterministically.
+    """
+
+    def __init__(self, spool_size: int = WORKSPACE_SPOOL_SIZE) -> None:
+        self._spool_size = spool_size
+        self._lock = threading.Lock()
+        self._directory: tp.Optional[str] = None
+        self._files: tp.Dict[str, SpooledFile] = {}
+        self._created: tp.List[SpooledFile] = []
+
+    def new_file(self, name: tp.Optional[str] = None) -> SpooledFile:
+        """Creates a file owned by the workspace but not added under its name yet, e.g. for a download attempt."""
+        spooled_file = SpooledFile(name, self._spool_size, self.directory)
+        with self._lock:
+            self._created.append(spooled_file)
+        return spooled_file
+
+    def add(self, name: str, spooled_file: SpooledFile) -> SpooledFile:
+        """Adds the file under the name. The previous file with the name, e.g. from a failed attempt, is discarded."""
+        spooled_file.name = name
+        with self._lock:
+            previous = self._files.get(name)
+            self._files[name] = spooled_file
+        if previous is not None and previous is not spooled_file:
+            previous.discard()
+        return spooled_file
+
+    def put_bytes(self, name: str, content: bytes) -> SpooledFile:
+        spooled_file = self.new_file(name)
+        spooled_file.write(content)
+        return self.add(name, spooled_file)
+
+    def put_path(self, name: str, path: str) -> SpooledFile:
+        """Adds the file written to the path from `new_path`."""
+        spooled_file = SpooledFile.from_path(name, path, self._spool_size, self.directory)
+        with self._lock:
+            self._created.append(spooled_file)
+        return self.add(name, spooled_file)
+
+    def new_path(self, name: str) -> str:
+        """Returns a new path in the workspace directory for the tools that write files by path."""
+        fd, path = _mkstemp(self.directory(), name)
+        os.close(fd)
+        return path
+
+    def get(self, name: str) -> tp.Optional[SpooledFile]:
+        with self._lock:
+            return self._files.get(name)
+
+    def directory(self) -> str:
+        """Returns the workspace directory, creates it on the first call."""
+        with self._lock:
+            if self._directory is None:
+                self._directory = FilesHelper.create_temp_directory()
+            return self._directory
+
+    def cleanup(self) -> None:
+        """Frees all the files and removes the directory. Safe to call several times."""
+        with self._lock:
+            files, self._created, self._files = self._created, [], {}
+            directory, self._directory = self._directory, None
+        for spooled_file in files:
+            spooled_file.discard()
+        if directory is not None and os.path.isdir(directory):
+            FilesHelper.remove_directory(directory)
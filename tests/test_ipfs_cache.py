@@ -0,0 +1,146 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from rrs_operator.utils.ipfs_cache import IPFSFilesCache
+
+CID_A = "Qm" + "a" * 44
+CID_B = "Qm" + "b" * 44
+CID_C = "Qm" + "c" * 44
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "ipfs_cache")
+
+
+def test_put_and_get(cache_dir, tmp_path):
+    cache = IPFSFilesCache(cache_dir, max_size=100)
+    source = tmp_path / "source"
+    source.write_bytes(b"from file")
+
+    cache.put_bytes(CID_A, b"from bytes")
+    cache.put_file(CID_B, str(source))
+
+    assert read(cache.get(CID_A)) == b"from bytes"
+    assert read(cache.get(CID_B)) == b"from file"
+    assert cache.get(CID_C) is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_put_reader_copies_from_the_position(cache_dir):
+    cache = IPFSFilesCache(cache_dir, max_size=100)
+    reader = io.BytesIO(b"skip:from reader")
+    reader.seek(5)
+
+    cache.put_reader(CID_A, reader)
+
+    assert read(cache.get(CID_A)) == b"from reader"
+
+
+def test_put_chunks_returns_the_path(cache_dir):
+    cache = IPFSFilesCache(cache_dir, max_size=100)
+
+    path = cache.put_chunks(CID_A, [b"a", b"b"])
+
+    assert path == cache.get(CID_A)
+    assert read(path) == b"ab"
+
+
+def test_invalid_cid_is_not_cached(cache_dir):
+    cache = IPFSFilesCache(cache_dir, max_size=100)
+
+    assert cache.put_chunks("../etc/passwd", [b"x"]) is None
+    cache.put_bytes("short", b"x")
+
+    assert os.listdir(cache_dir) == []
+
+
+def test_least_recently_used_file_is_evicted(cache_dir):
+    cache = IPFSFilesCache(cache_dir, max_size=10)
+    cache.put_bytes(CID_A, b"a" * 4)
+    cache.put_bytes(CID_B, b"b" * 4)
+    cache.get(CID_A)
+
+    cache.put_bytes(CID_C, b"c" * 4)
+
+    assert cache.get(CID_B) is None
+    assert not os.path.exists(os.path.join(cache_dir, CID_B))
+    assert cache.get(CID_A) is not None
+    assert cache.get(CID_C) is not None
+    assert cache.stats()["size"] == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_file_bigger_than_the_cache_is_not_cached(cache_dir):
+    cache = IPFSFilesCache(cache_dir, max_size=4)
+
+    cache.put_bytes(CID_A, b"too big")
+
+    assert cache.get(CID_A) is None
+
+
+def test_remove(cache_dir):
+    cache = IPFSFilesCache(cache_dir, max_size=100)
+    cache.put_bytes(CID_A, b"a")
+
+    cache.remove(CID_A)
+    cache.remove(CID_B)
+
+    assert cache.get(CID_A) is None
+    assert os.listdir(cache_dir) == []
+    assert cache.stats()["size"] == 0
+
+
+def test_cached_files_are_reused_after_restart(cache_dir):
+    cache = IPFSFilesCache(cache_dir, max_size=100)
+    cache.put_bytes(CID_A, b"a")
+
+    reopened = IPFSFilesCache(cache_dir, max_size=100)
+
+    assert read(reopened.get(CID_A)) == b"a"
+    assert reopened.stats()["files"] == 1
+
+
+def test_failed_write_leaves_no_part_file(cache_dir):
+    cache = IPFSFilesCache(cache_dir, max_size=100)
+
+    def chunks():
+        yield b"a"
+        raise ConnectionError("download failed")
+
+    with pytest.raises(ConnectionError):
+        cache.put_chunks(CID_A, chunks())
+
+    assert os.listdir(cache_dir) == []
+
+
+def test_only_part_files_of_dead_processes_are_removed_on_open(cache_dir):
+    os.makedirs(cache_dir)
+    names = [
+        f"{CID_A}.{dead_pid()}.0123.tmp",
+        f"{CID_B}.{os.getppid()}.0123.tmp",
+        f"{CID_C}.{os.getpid()}.0123.tmp",
+        "unknown.tmp",
+    ]
+    for name in names:
+        open(os.path.join(cache_dir, name), "wb").close()
+
+    IPFSFilesCache(cache_dir, max_size=100)
+
+    assert sorted(os.listdir(cache_dir)) == sorted(names[1:])
@@ -0,0 +1,112 @@
+import nacl.exceptions
+import pytest
+from substrateinterface import Keypair, KeypairType
+
+import utils.keyring as keyring
+from utils.keyring import Keyring
+
+ADMIN_SEED = Keypair.generate_mnemonic()
+PEER_SEED = Keypair.generate_mnemonic()
+
+
+def ed25519(seed):
+    return Keypair.create_from_mnemonic(seed, crypto_type=KeypairType.ED25519)
+
+
+@pytest.fixture(autouse=True)
+def admin_seed(monkeypatch):
+    monkeypatch.setattr(keyring, "ADMIN_SEED", ADMIN_SEED)
+    Keyring.clear()
+    yield
+    Keyring.clear()
+
+
+def test_admin_account_is_derived_once():
+    assert Keyring.admin_account() is Keyring.admin_account()
+    assert Keyring.admin_address() == ed25519(ADMIN_SEED).ss58_address
+
+
+def test_public_key_of_address():
+    peer = ed25519(PEER_SEED)
+
+    assert Keyring.public_key(peer.ss58_address) == peer.public_key
+
+
+def test_keypair_from_seed_is_cached_without_the_seed():
+    keypair = Keyring.keypair_from_seed(PEER_SEED)
+
+    assert Keyring.keypair_from_seed(PEER_SEED) is keypair
+    assert keypair.public_key == ed25519(PEER_SEED).public_key
+    assert PEER_SEED not in Keyring._keypairs
+
+
+def test_message_from_the_peer_is_decrypted():
+    peer = ed25519(PEER_SEED)
+    admin = ed25519(ADMIN_SEED)
+    encrypted = peer.encrypt_message(b"report", admin.public_key)
+
+    assert Keyring.decrypt(encrypted, peer.public_key) == b"report"
+    assert Keyring.decrypt(encrypted, peer.public_key) == b"report"
+    assert len(Keyring._boxes) == 1
+
+
+def test_message_to_the_device_is_decrypted_with_its_keypair():
+    admin = ed25519(ADMIN_SEED)
+    device = Keyring.keypair_from_seed(PEER_SEED)
+    encrypted = admin.encrypt_message(b"settings", device.public_key)
+
+    assert Keyring.decrypt(encrypted, admin.public_key, device) == b"settings"
+
+
+def test_message_is_decrypted_in_place():
+    peer = ed25519(PEER_SEED)
+    buffer = bytearray(peer.encrypt_message(b"report", ed25519(ADMIN_SEED).public_key))
+
+    assert Keyring.decrypt_in_place(buffer, peer.public_key) is buffer
+    assert buffer == b"report"
+
+
+def test_tampered_message_isnt_decrypted_in_place():
+    peer = ed25519(PEER_SEED)
+    buffer = bytearray(peer.encrypt_message(b"report", ed25519(ADMIN_SEED).public_key))
+    buffer[-1] ^= 1
+
+    with pytest.raises(nacl.exceptions.CryptoError):
+        Keyring.decrypt_in_place(buffer, peer.public_key)
+
+
+def test_too_short_message_isnt_decrypted_in_place():
+    with pytest.raises(nacl.exceptions.CryptoError):
+        Keyring.decrypt_in_place(bytearray(30), ed25519(PEER_SEED).public_key)
+
+
+def test_encrypted_message_is_readable_by_the_peer():
+    peer = ed25519(PEER_SEED)
+    admin = ed25519(ADMIN_SEED)
+
+    encrypted = Keyring.encrypt("response", peer.public_key)
+
+    assert peer.decrypt_message(encrypted, admin.public_key) == b"response"
+    assert Keyring.encrypt("response", peer.public_key) != encrypted
+
+
+def test_least_recently_used_key_is_evicted(monkeypatch):
+    monkeypatch.setattr(keyring, "KEYRING_CACHE_SIZE", 2)
+    addresses = [ed25519(Keypair.generate_mnemonic()).ss58_address for _ in range(3)]
+    Keyring.public_key(addresses[0])
+    Keyring.public_key(addresses[1])
+    Keyring.public_key(addresses[0])
+
+    Keyring.public_key(addresses[2])
+
+    assert list(Keyring._public_keys) == [addresses[0], addresses[2]]
+
+
+def test_clear_drops_all_the_keys():
+    Keyring.keypair_from_seed(PEER_SEED)
+    admin_account = Keyring.admin_account()
+
+    Keyring.clear()
+
+    assert Keyring._keypairs == {}
+    assert Keyring.admin_account() is not admin_account
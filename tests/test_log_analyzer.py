@@ -0,0 +1,129 @@
+import io
+
+import pytest
+
+from rrs_operator.utils.log_analyzer import MAX_LINE_LENGTH, MAX_TEMPLATE_LENGTH, LogAnalyzer, OtherLogIssues
+from rrs_operator.utils.reports_problem_type.src import WarningsReport
+
+
+def entry(message, level="ERROR", logger_name="homeassistant.components.zha", time="10:23:45.123"):
+    return f"2024-01-15 {time} {level} (MainThread) [{logger_name}] {message}\n"
+
+
+def analyze(*lines, limit=None):
+    return LogAnalyzer.analyze(io.BytesIO("".join(lines).encode("utf-8")), limit=limit)
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("Device 'Kitchen lamp' is offline", "Device <str> is offline"),
+        ("Unknown entity 123e4567-e89b-12d3-a456-426614174000", "Unknown entity <uuid>"),
+        ("Update at 2024-01-15T10:23:45Z failed", "Update at <time> failed"),
+        ("Can't connect to 192.168.1.10:8123", "Can't connect to <ip>"),
+        ("Device 00:1a:2b:3c:4d:5e not found", "Device <mac> not found"),
+        ("Bad address 0x1f", "Bad address <hex>"),
+        ("Retry 3 of 5", "Retry <num> of <num>"),
+        ("Timeout after 1.5s", "Timeout after <num>s"),
+        ("Update took 10ms, 250µs, 2.5 s", "Update took <num>ms, <num>µs, <num> s"),
+        ("Battery at 15%", "Battery at <num>%"),
+        ("Entity 5f3a9c not found", "Entity 5f3a9c not found"),
+        ("sensor_1 is unavailable", "sensor_1 is unavailable"),
+    ],
+)
+def test_normalize(message, expected):
+    assert LogAnalyzer.normalize(message) == expected
+
+
+def test_entries_with_the_same_template_are_one_issue():
+    issues = analyze(
+        entry("Device 'a' is offline", time="10:00:00"),
+        entry("Device 'b' is offline", time="11:00:00"),
+        entry("Device 'a' is offline", logger_name="homeassistant.components.mqtt"),
+    )
+
+    assert [(issue.logger_name, issue.count) for issue in issues] == [
+        ("homeassistant.components.zha", 2),
+        ("homeassistant.components.mqtt", 1),
+    ]
+    assert issues[0].description == "ERROR [homeassistant.components.zha] Device <str> is offline"
+    assert (issues[0].first_seen, issues[0].last_seen) == ("2024-01-15 10:00:00", "2024-01-15 11:00:00")
+
+
+def test_info_and_continuation_lines_are_skipped():
+    issues = analyze(
+        entry("Started", level="INFO"),
+        entry("Unexpected error"),
+        "Traceback (most recent call last):\n",
+        '  File "zha.py", line 1, in <module>\n',
+    )
+
+    assert [issue.template for issue in issues] == ["Unexpected error"]
+
+
+def test_issues_are_ordered_by_level_and_count():
+    issues = analyze(
+        entry("warning", level="WARNING"),
+        entry("warning", level="WARNING"),
+        entry("rare error"),
+        entry("error"),
+        entry("error"),
+        entry("critical", level="CRITICAL"),
+    )
+
+    assert [issue.template for issue in issues] == ["critical", "error", "rare error", "warning"]
+
+
+def test_issues_over_the_limit_are_folded():
+    issues = analyze(
+        entry("error", time="10:00:00"),
+        entry("error"),
+        entry("critical", level="CRITICAL"),
+        entry("warning", level="WARNING", time="12:00:00"),
+        limit=1,
+    )
+
+    assert [issue.template for issue in issues[:1]] == ["critical"]
+    other = issues[1]
+    assert isinstance(other, OtherLogIssues)
+    assert other.description == "Other issues in the log"
+    assert (other.count, other.first_seen, other.last_seen) == (3, "2024-01-15 10:00:00", "2024-01-15 12:00:00")
+    assert other.summary().splitlines()[1:] == [issue.summary() for issue in other.issues]
+
+
+def test_issues_within_the_limit_are_not_folded():
+    issues = analyze(entry("error"), entry("warning", level="WARNING"), limit=2)
+
+    assert [issue.template for issue in issues] == ["error", "warning"]
+
+
+def test_new_signatures_over_the_limit_are_dropped():
+    analyzer = LogAnalyzer(max_signatures=1)
+
+    analyzer.feed(entry("first").rstrip("\n"))
+    analyzer.feed(entry("second").rstrip("\n"))
+    analyzer.feed(entry("first").rstrip("\n"))
+
+    assert [(issue.template, issue.count) for issue in analyzer.issues()] == [("first", 2)]
+    assert analyzer.dropped == 1
+
+
+def test_long_lines_and_invalid_utf8_dont_break_the_analysis():
+    log = entry("x" * (MAX_LINE_LENGTH * 2)).encode("utf-8") + b"\xff\xfe\n" + entry("after").encode("utf-8")
+
+    issues = LogAnalyzer.analyze(io.BytesIO(log), limit=None)
+
+    assert [issue.template for issue in issues][-1] == "after"
+    assert len(issues[0].template) == MAX_TEMPLATE_LENGTH
+
+
+def test_warnings_report_keeps_the_listed_warnings_with_the_log_issues():
+    log_issues = analyze(entry("Device 'a' is offline"))
+
+    report = WarningsReport("Low battery*Disk full", log_issues)
+
+    assert report.get_descriptions() == [
+        "Low battery",
+        "Disk full",
+        "ERROR [homeassistant.components.zha] Device <str> is offline",
+    ]
@@ -0,0 +1,161 @@
+import time
+
+import pytest
+
+import rrs_operator.utils.occurrences_buffer as occurrences_buffer
+from rrs_operator.utils.occurrences_buffer import OccurrencesBuffer
+
+
+class FakeOdoo:
+    """Keeps the tickets in a dict. Reads fail while `down` is set, writes of the tickets in `failing_writes`
+    fail the given number of times.
+    """
+
+    def __init__(self, tickets):
+        self.tickets = {ticket_id: {"id": ticket_id, **ticket} for ticket_id, ticket in tickets.items()}
+        self.down = False
+        self.failing_writes = {}
+        self.reads = 0
+        self.writes = []
+
+    def read_tickets(self, ticket_ids, fields):
+        self.reads += 1
+        if self.down:
+            raise ConnectionError("Odoo is down")
+        return {ticket_id: dict(self.tickets[ticket_id]) for ticket_id in ticket_ids if ticket_id in self.tickets}
+
+    def update_tickets(self, updates):
+        errors = {}
+        for ticket_id, data in updates.items():
+            if self.failing_writes.get(ticket_id):
+                self.failing_writes[ticket_id] -= 1
+                errors[ticket_id] = ConnectionError("write failed")
+                continue
+            self.tickets[ticket_id].update(data)
+            self.writes.append(ticket_id)
+        return errors
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(occurrences_buffer, "OCCURRENCES_RETRY_DELAY", 0)
+
+
+@pytest.fixture
+def make_buffer():
+    buffers = []
+
+    def make(odoo, **kwargs):
+        kwargs.setdefault("flush_interval", 3600)
+        buffer = OccurrencesBuffer(odoo, **kwargs)
+        buffers.append(buffer)
+        return buffer
+
+    yield make
+    for buffer in buffers:
+        if buffer._thread.is_alive():
+            buffer.odoo.down = False
+            buffer.stop()
+
+
+def test_occurrences_of_a_ticket_are_merged_into_one_write(make_buffer):
+    odoo = FakeOdoo({1: {"count": 2, "description": "Issue from HA: disk full"}})
+    buffer = make_buffer(odoo)
+
+    buffer.add(1, "disk full")
+    buffer.add(1, "sensor offline")
+    buffer.add(1, "sensor offline")
+    buffer.flush()
+
+    assert odoo.writes == [1]
+    assert odoo.tickets[1]["count"] == 5
+    assert odoo.tickets[1]["description"] == "Issue from HA: disk full sensor offline"
+    assert odoo.tickets[1]["last_occurred"]
+
+
+def test_flush_reads_all_the_tickets_once(make_buffer):
+    odoo = FakeOdoo({1: {"count": 1, "description": ""}, 2: {"count": 1, "description": ""}})
+    buffer = make_buffer(odoo)
+
+    buffer.add(1, "a")
+    buffer.add(2, "b")
+    buffer.flush()
+    buffer.flush()
+
+    assert odoo.reads == 1
+    assert sorted(odoo.writes) == [1, 2]
+
+
+def test_deleted_ticket_is_skipped(make_buffer):
+    odoo = FakeOdoo({1: {"count": 1, "description": ""}})
+    buffer = make_buffer(odoo)
+
+    buffer.add(1, "a")
+    buffer.add(2, "b")
+    buffer.flush()
+
+    assert odoo.writes == [1]
+    assert buffer._pending == {}
+
+
+def test_flush_size_wakes_up_the_flushing_thread(make_buffer):
+    odoo = FakeOdoo({1: {"count": 1, "description": ""}, 2: {"count": 1, "description": ""}})
+    buffer = make_buffer(odoo, flush_size=2)
+
+    buffer.add(1, "a")
+    buffer.add(2, "b")
+    deadline = time.monotonic() + 5
+    while len(odoo.writes) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert sorted(odoo.writes) == [1, 2]
+
+
+def test_only_the_failed_tickets_are_written_again(make_buffer):
+    odoo = FakeOdoo({1: {"count": 1, "description": ""}, 2: {"count": 1, "description": ""}})
+    odoo.failing_writes = {2: 1}
+    buffer = make_buffer(odoo)
+
+    buffer.add(1, "a")
+    buffer.add(2, "b")
+    buffer.flush()
+
+    assert odoo.writes == [1, 2]
+    assert odoo.tickets[1]["count"] == 2
+    assert odoo.tickets[2]["count"] == 2
+
+
+def test_stop_doesnt_hang_while_odoo_is_down(make_buffer, monkeypatch):
+    monkeypatch.setattr(occurrences_buffer, "OCCURRENCES_STOP_ATTEMPTS", 2)
+    odoo = FakeOdoo({1: {"count": 1, "description": ""}})
+    odoo.down = True
+    buffer = make_buffer(odoo)
+    buffer.add(1, "a")
+
+    started = time.monotonic()
+    buffer.stop()
+
+    assert time.monotonic() - started < 5
+    assert odoo.reads == 2
+    assert not buffer._thread.is_alive()
+    assert buffer._pending[1]["count"] == 1
+
+
+def test_not_written_occurrences_are_restored_and_merged(make_buffer, monkeypatch):
+    monkeypatch.setattr(occurrences_buffer, "OCCURRENCES_STOP_ATTEMPTS", 1)
+    odoo = FakeOdoo({1: {"count": 10, "description": "a"}, 2: {"count": 1, "description": ""}})
+    odoo.failing_writes = {2: 1}
+    buffer = make_buffer(odoo)
+    buffer.add(1, "a")
+    buffer.add(2, "b")
+    buffer.stop()
+
+    assert odoo.writes == [1]
+    assert list(buffer._pending) == [2]
+
+    buffer.add(2, "c")
+    buffer.flush()
+
+    assert odoo.tickets[1]["count"] == 11
+    assert odoo.tickets[2]["count"] == 3
+    assert odoo.tickets[2]["description"] == " b c"
@@ -0,0 +1,150 @@
+import sqlite3
+import threading
+import time
+
+from rrs_operator.utils.reports_queue import ReportsQueue
+
+
+def test_reports_are_taken_in_order():
+    queue = ReportsQueue(":memory:")
+    first = queue.put("a", "1")
+    second = queue.put("b", "2")
+
+    assert queue.take(0) == (first, "a", "1", None)
+    assert queue.take(0) == (second, "b", "2", None)
+    assert queue.take(0) is None
+
+
+def test_take_waits_for_a_report():
+    queue = ReportsQueue(":memory:")
+    threading.Timer(0.05, queue.put, ("a", "1")).start()
+
+    assert queue.take(5)[2] == "1"
+
+
+def test_reports_of_one_sender_are_taken_one_by_one():
+    queue = ReportsQueue(":memory:")
+    a1 = queue.put("a", "a1")
+    a2 = queue.put("a", "a2")
+    b1 = queue.put("b", "b1")
+
+    assert queue.take(0)[0] == a1
+    assert queue.take(0)[0] == b1
+    assert queue.take(0) is None
+
+    queue.ack(a1)
+    assert queue.take(0)[0] == a2
+
+
+def test_released_report_blocks_its_sender_until_the_delay():
+    queue = ReportsQueue(":memory:")
+    a1 = queue.put("a", "a1")
+    queue.put("a", "a2")
+    queue.take(0)
+
+    queue.release(a1, delay=0.1)
+
+    assert queue.take(0) is None
+    assert queue.take(5)[0] == a1
+
+
+def test_report_is_delivered_again_after_the_visibility_timeout():
+    queue = ReportsQueue(":memory:", visibility_timeout=0.1)
+    report_id = queue.put("a", "1")
+    queue.take(0)
+
+    assert queue.take(0) is None
+    assert queue.take(5)[0] == report_id
+
+
+def test_extend_keeps_the_report_hidden():
+    queue = ReportsQueue(":memory:", visibility_timeout=0.2)
+    report_id = queue.put("a", "1")
+    queue.take(0)
+
+    time.sleep(0.1)
+    queue.extend([report_id])
+    time.sleep(0.15)
+
+    assert queue.take(0) is None
+
+
+def test_saved_response_is_returned_on_the_next_delivery():
+    queue = ReportsQueue(":memory:")
+    report_id = queue.put("a", "1")
+    queue.take(0)
+
+    queue.save_response(report_id, "response")
+    queue.release(report_id)
+
+    assert queue.take(0) == (report_id, "a", "1", "response")
+
+
+def test_report_fails_after_max_attempts_and_unblocks_its_sender():
+    queue = ReportsQueue(":memory:", max_attempts=2)
+    a1 = queue.put("a", "a1")
+    a2 = queue.put("a", "a2")
+    for _ in range(2):
+        assert queue.take(0)[0] == a1
+        queue.release(a1)
+
+    assert queue.take(0)[0] == a2
+    assert queue.stats() == {"waiting": 0, "taken": 1, "failed": 1, "max_size": None}
+
+
+def test_reports_taken_before_a_restart_are_visible_on_open(tmp_path):
+    path = str(tmp_path / "reports_queue.sqlite3")
+    queue = ReportsQueue(path)
+    a1 = queue.put("a", "a1")
+    queue.put("a", "a2")
+    queue.take(0)
+    queue.release(queue.put("b", "b1"), delay=3600)
+
+    reopened = ReportsQueue(path)
+
+    assert reopened.take(0)[0] == a1
+    assert reopened.take(0)[1] == "b"
+
+
+def test_put_waits_while_the_queue_is_full():
+    queue = ReportsQueue(":memory:", max_size=2)
+    queue.put("a", "1")
+    queue.put("b", "2")
+
+    assert queue.put("c", "3", timeout=0.05) is None
+
+    report_id = queue.take(0)[0]
+    threading.Timer(0.05, queue.ack, (report_id,)).start()
+    assert queue.put("c", "3", timeout=5) is not None
+    assert queue.stats()["waiting"] == 2
+
+
+def test_failed_reports_dont_take_slots():
+    queue = ReportsQueue(":memory:", max_attempts=1, max_size=1)
+    report_id = queue.put("a", "1")
+    queue.take(0)
+    queue.release(report_id)
+
+    assert queue.take(0) is None
+    assert queue.put("a", "2", timeout=0) is not None
+
+
+def test_old_database_gets_the_response_column(tmp_path):
+    path = str(tmp_path / "reports_queue.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute(
+        """CREATE TABLE reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender TEXT NOT NULL,
+            message TEXT NOT NULL,
+            visible_at REAL,
+            attempts INTEGER NOT NULL DEFAULT 0
+        )"""
+    )
+    db.execute("INSERT INTO reports (sender, message, visible_at) VALUES ('a', '1', 0)")
+    db.commit()
+    db.close()
+
+    queue = ReportsQueue(path)
+
+    assert queue.take(0) == (1, "a", "1", None)
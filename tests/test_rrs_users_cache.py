@@ -0,0 +1,119 @@
+import pytest
+
+import helpers.rrs_users_cache as rrs_users_cache
+from helpers.rrs_users_cache import RRSUsersCache
+
+
+class FakeOdooHelper:
+    """Answers `search_read` from a dict of rows and counts the calls."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def search_read(self, model, search_domains, fields, limit=None):
+        self.calls += 1
+        (field, _, value), = search_domains
+        return [dict(row) for row in self.rows if row.get(field) == value][:limit]
+
+
+def user(record_id, address, email, paid=False):
+    return {"id": record_id, "address": address, "customer_email": email, "paid": paid}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    RRSUsersCache.clear()
+    yield
+    RRSUsersCache.clear()
+
+
+def test_get_or_load_reads_odoo_once():
+    helper = FakeOdooHelper([user(1, "4Addr", "a@example.com")])
+
+    assert RRSUsersCache.get_or_load(helper, "address", "4Addr")["id"] == 1
+    assert RRSUsersCache.get_or_load(helper, "address", "4Addr")["id"] == 1
+    assert helper.calls == 1
+
+
+def test_row_is_found_by_any_indexed_field_and_id():
+    helper = FakeOdooHelper([user(1, "4Addr", "a@example.com")])
+    RRSUsersCache.get_or_load(helper, "address", "4Addr")
+
+    assert RRSUsersCache.get_or_load(helper, "customer_email", "a@example.com")["address"] == "4Addr"
+    assert RRSUsersCache.get_or_load(helper, "id", 1)["customer_email"] == "a@example.com"
+    assert helper.calls == 1
+
+
+def test_missing_user_is_not_cached():
+    helper = FakeOdooHelper([])
+
+    assert RRSUsersCache.get_or_load(helper, "address", "4Addr") is None
+    assert RRSUsersCache.get_or_load(helper, "address", "4Addr") is None
+    assert helper.calls == 2
+
+
+def test_empty_value_is_not_looked_up():
+    helper = FakeOdooHelper([])
+
+    assert RRSUsersCache.get_or_load(helper, "address", "") is None
+    assert helper.calls == 0
+
+
+def test_returned_rows_are_copies():
+    helper = FakeOdooHelper([user(1, "4Addr", "a@example.com")])
+    RRSUsersCache.get_or_load(helper, "address", "4Addr")["paid"] = True
+
+    assert RRSUsersCache.get("id", 1)["paid"] is False
+
+
+def test_expired_row_is_read_again(monkeypatch):
+    helper = FakeOdooHelper([user(1, "4Addr", "a@example.com")])
+    monkeypatch.setattr(rrs_users_cache, "RRS_USERS_CACHE_TTL", -1)
+    RRSUsersCache.get_or_load(helper, "address", "4Addr")
+
+    assert RRSUsersCache.get("address", "4Addr") is None
+    RRSUsersCache.get_or_load(helper, "address", "4Addr")
+    assert helper.calls == 2
+
+
+def test_invalidate_by_id_drops_all_indexes():
+    helper = FakeOdooHelper([user(1, "4Addr", "a@example.com")])
+    RRSUsersCache.get_or_load(helper, "address", "4Addr")
+    helper.rows[0]["paid"] = True
+
+    RRSUsersCache.invalidate("id", 1)
+
+    assert RRSUsersCache.get("customer_email", "a@example.com") is None
+    assert RRSUsersCache.get_or_load(helper, "address", "4Addr")["paid"] is True
+
+
+def test_invalidate_by_indexed_field():
+    helper = FakeOdooHelper([user(1, "4Addr", "a@example.com")])
+    RRSUsersCache.get_or_load(helper, "address", "4Addr")
+
+    RRSUsersCache.invalidate("customer_email", "a@example.com")
+
+    assert RRSUsersCache.get("id", 1) is None
+
+
+def test_changed_indexed_value_doesnt_find_the_old_one():
+    RRSUsersCache.put(user(1, "4Addr", "old@example.com"))
+    RRSUsersCache.put(user(1, "4Addr", "new@example.com"))
+
+    assert RRSUsersCache.get("customer_email", "old@example.com") is None
+    assert RRSUsersCache.get("customer_email", "new@example.com")["id"] == 1
+
+
+def test_least_recently_used_row_is_evicted(monkeypatch):
+    monkeypatch.setattr(rrs_users_cache, "RRS_USERS_CACHE_SIZE", 2)
+    RRSUsersCache.put(user(1, "4A", "a@example.com"))
+    RRSUsersCache.put(user(2, "4B", "b@example.com"))
+    RRSUsersCache.get("id", 1)
+
+    RRSUsersCache.put(user(3, "4C", "c@example.com"))
+
+    assert RRSUsersCache.get("id", 2) is None
+    assert RRSUsersCache.get("address", "4B") is None
+    assert RRSUsersCache.get("id", 1) is not None
+    assert RRSUsersCache.get("id", 3) is not None
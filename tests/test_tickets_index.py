@@ -0,0 +1,75 @@
+import pytest
+
+from rrs_operator.utils.tickets_index import TicketsIndex, normalize_description, ticket_fingerprint
+
+
+@pytest.mark.parametrize(
+    "description, expected",
+    [
+        ("Error at 2024-01-15 10:23:45.123 in zha", "error at <ts> in zha"),
+        ("Error at 2024-01-15T10:23:45+02:00", "error at <ts>"),
+        ("Timeout at 10:23:45", "timeout at <ts>"),
+        ("Device 123e4567-e89b-12d3-a456-426614174000 lost", "device <id> lost"),
+        ("Entry 01ARZ3NDEKTSV4RRFFQ69G5FAV failed", "entry <id> failed"),
+        ("Token 0123456789abcdef0123 expired", "token <id> expired"),
+        ("Retry 3 of 5 after 1.5 s", "retry <n> of <n> after <n> s"),
+        ("  Too   many\n spaces ", "too many spaces"),
+    ],
+)
+def test_normalize_description(description, expected):
+    assert normalize_description(description) == expected
+
+
+def test_words_are_not_taken_for_hex_ids():
+    assert normalize_description("Integration deadbeefcafebabe failed") == "integration deadbeefcafebabe failed"
+
+
+def test_fingerprint_ignores_the_variable_parts():
+    first = ticket_fingerprint("a@example.com", "warnings", "Device 42 offline at 2024-01-15 10:23:45")
+    second = ticket_fingerprint("a@example.com", "warnings", "device 7 offline at 2024-02-01 08:00:00")
+
+    assert first == second
+
+
+def test_fingerprint_depends_on_email_and_source():
+    fingerprint = ticket_fingerprint("a@example.com", "warnings", "Device offline")
+
+    assert fingerprint != ticket_fingerprint("b@example.com", "warnings", "Device offline")
+    assert fingerprint != ticket_fingerprint("a@example.com", "errors", "Device offline")
+
+
+def test_index_add_get_and_get_many():
+    index = TicketsIndex(":memory:")
+    index.add("fp1", 1)
+    index.add("fp2", 2)
+
+    assert index.get("fp1") == 1
+    assert index.get("missing") is None
+    assert index.get_many(["fp1", "fp2", "missing", "fp1"]) == {"fp1": 1, "fp2": 2}
+    assert index.get_many([]) == {}
+
+
+def test_add_replaces_the_ticket_of_the_fingerprint():
+    index = TicketsIndex(":memory:")
+    index.add("fp", 1)
+    index.add("fp", 2)
+
+    assert index.get("fp") == 2
+
+
+def test_remove_ticket_drops_all_its_fingerprints():
+    index = TicketsIndex(":memory:")
+    index.add("fp1", 1)
+    index.add("fp2", 1)
+    index.add("fp3", 2)
+
+    index.remove_ticket(1)
+
+    assert index.get_many(["fp1", "fp2", "fp3"]) == {"fp3": 2}
+
+
+def test_index_is_persistent(tmp_path):
+    path = str(tmp_path / "tickets_index.sqlite3")
+    TicketsIndex(path).add("fp", 1)
+
+    assert TicketsIndex(path).get("fp") == 1
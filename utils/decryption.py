@@ -1,35 +1,48 @@
+import binascii
+import io
 import json
+import multiprocessing
 import os
+import threading
 import typing as tp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from dotenv import load_dotenv
-from robonomicsinterface import Account
-from substrateinterface import Keypair, KeypairType
+
+from utils.keyring import Keyring
 
 load_dotenv()
-ADMIN_SEED = os.getenv("ADMIN_SEED")
+HEX_CHUNK_SIZE = 1024 * 1024
+DECRYPTION_WORKERS = int(os.getenv("DECRYPTION_WORKERS") or os.cpu_count() or 1)
+# Smaller files are decrypted in the calling thread, sending them to a process costs more than decrypting.
+DECRYPTION_INLINE_SIZE = int(os.getenv("DECRYPTION_INLINE_SIZE") or 256 * 1024)
+
+_pool: tp.Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
 
 def decrypt_message(encrypted_message: str, sender_address: str, logger) -> str:
-    recipient_acc = Account(ADMIN_SEED, crypto_type=KeypairType.ED25519)
-    sender_kp = Keypair(ss58_address=sender_address)
+    admin_keypair = Keyring.admin_account().keypair
+    sender_public_key = Keyring.public_key(sender_address)
     if isinstance(encrypted_message, str):
         try:
             data_json = json.loads(encrypted_message)
         except:
-            return _decrypt_message(encrypted_message, sender_kp.public_key, recipient_acc.keypair, logger).decode("utf-8")
+            return _decrypt_message(encrypted_message, sender_public_key, admin_keypair, logger).decode("utf-8")
     else:
         data_json = encrypted_message
     try:
-        if recipient_acc.get_address() in data_json:
+        admin_address = Keyring.admin_address()
+        if admin_address in data_json:
             decrypted_seed = _decrypt_message(
-                data_json[recipient_acc.get_address()],
-                sender_kp.public_key,
-                recipient_acc.keypair,
+                data_json[admin_address],
+                sender_public_key,
+                admin_keypair,
                 logger
             ).decode("utf-8")
-            decrypted_acc = Account(decrypted_seed, crypto_type=KeypairType.ED25519)
+            decrypted_keypair = Keyring.keypair_from_seed(decrypted_seed)
             decrypted_data = _decrypt_message(
-                data_json["data"], sender_kp.public_key, decrypted_acc.keypair, logger
+                data_json["data"], sender_public_key, decrypted_keypair, logger
             ).decode("utf-8")
             return decrypted_data
         else:
@@ -50,6 +63,156 @@ def _decrypt_message(encrypted_message: str, sender_public_key: bytes, admin_key
             encrypted_message = encrypted_message[2:]
         bytes_encrypted = bytes.fromhex(encrypted_message)
 
-        return admin_keypair.decrypt_message(bytes_encrypted, sender_public_key)
+        return Keyring.decrypt(bytes_encrypted, sender_public_key, admin_keypair)
     except Exception as e:
-        logger.debug(f"exception in decryption: {e}")
\ No newline at end of file
+        logger.debug(f"exception in decryption: {e}")
+
+
+def decrypt_file(encrypted_file_path: str, output_file_path: str, sender_address: str, logger) -> bool:
+    """Decrypts the downloaded file and writes the decrypted bytes to the output file without building str copies.
+    The hex content is decoded chunk by chunk into one preallocated buffer and decrypted in place, so the peak
+    memory is about the size of the decoded ciphertext.
+    :param encrypted_file_path: Path to the file with hex or json (devices scheme) encrypted content
+    :param output_file_path: Path to write the decrypted content to
+    :param sender_address: Sender's address in Robonomics parachain
+
+    :return: True if decrypted successfully
+    """
+    with open(encrypted_file_path, "rb") as f:
+        decrypted_bytes = _decrypt_stream(f, os.path.getsize(encrypted_file_path), sender_address, logger)
+    if decrypted_bytes is None:
+        logger.error(f"Couldn't decrypt file {encrypted_file_path}")
+        return False
+    with open(output_file_path, "wb") as f:
+        f.write(decrypted_bytes)
+    return True
+
+
+def decrypt_content(encrypted_content: bytes, sender_address: str, logger) -> tp.Optional[bytes]:
+    """In-memory counterpart of `decrypt_file` for the files which were not written to the disk.
+    :param encrypted_content: Hex or json (devices scheme) encrypted content
+
+    :return: Decrypted content or None if it couldn't be decrypted
+    """
+    return _decrypt_stream(io.BytesIO(encrypted_content), len(encrypted_content), sender_address, logger)
+
+
+def decrypt_files(files: tp.Dict[str, tp.Tuple[str, str]], sender_address: str, logger) -> tp.Dict[str, bool]:
+    """Decrypts all the files of a report in the process pool, so big reports use all the cores.
+    Supports both the plain and the devices schemes, like `decrypt_file`.
+    :param files: Dict file name -> (path to the encrypted file, path to write the decrypted content to)
+    :param sender_address: Sender's address in Robonomics parachain
+
+    :return: Dict file name -> True if decrypted successfully
+    """
+    return _decrypt_in_pool(
+        decrypt_file, files, lambda paths: os.path.getsize(paths[0]), sender_address, logger, unpack=True
+    )
+
+
+def decrypt_contents(encrypted_contents: tp.Dict[str, bytes], sender_address: str, logger) -> tp.Dict[str, tp.Optional[bytes]]:
+    """Decrypts the in-memory files with `decrypt_content`, the big ones in the process pool.
+    :param encrypted_contents: Dict file name -> encrypted content
+
+    :return: Dict file name -> decrypted content or None if it couldn't be decrypted
+    """
+    return _decrypt_in_pool(decrypt_content, encrypted_contents, len, sender_address, logger)
+
+
+def _decrypt_in_pool(
+    decrypt: tp.Callable,
+    items: tp.Dict[str, tp.Any],
+    size_of: tp.Callable[[tp.Any], int],
+    sender_address: str,
+    logger,
+    unpack: bool = False,
+) -> tp.Dict[str, tp.Any]:
+    """Calls `decrypt(*args, sender_address, logger)` for every item: the small ones in the calling thread,
+    the big ones in the process pool. Falls back to the calling thread if the pool is broken.
+    :param decrypt: Module level function, so it can be sent to the spawned processes
+    :param items: Dict name -> argument of `decrypt`, or a tuple of the arguments if `unpack` is set
+    :param size_of: Size of the item to compare with DECRYPTION_INLINE_SIZE
+
+    :return: Dict name -> result of `decrypt` in the order of the items
+    """
+    results = {}
+    futures = {}
+    pool = _get_pool()
+    for name, item in items.items():
+        args = item if unpack else (item,)
+        if pool is None or size_of(item) <= DECRYPTION_INLINE_SIZE:
+            results[name] = decrypt(*args, sender_address, logger)
+        else:
+            futures[name] = pool.submit(decrypt, *args, sender_address, logger)
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except BrokenProcessPool:
+            logger.error("Decryption process pool is broken, decrypting in the current thread")
+            _reset_pool(pool)
+            args = items[name] if unpack else (items[name],)
+            results[name] = decrypt(*args, sender_address, logger)
+    return {name: results[name] for name in items}
+
+
+def _get_pool() -> tp.Optional[ProcessPoolExecutor]:
+    """Creates the pool on the first use. Processes are spawned, not forked, because the parent has many threads."""
+    global _pool
+    if DECRYPTION_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=DECRYPTION_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def _decrypt_stream(f: tp.BinaryIO, size: int, sender_address: str, logger) -> tp.Optional[bytes]:
+    first_char = f.read(1)
+    while first_char and first_char in b" \t\r\n":
+        first_char = f.read(1)
+    f.seek(0)
+    if first_char == b"{":
+        decrypted_data = decrypt_message(json.load(f), sender_address, logger)
+        return decrypted_data.encode("utf-8") if decrypted_data is not None else None
+    try:
+        return Keyring.decrypt_in_place(_read_hex_file(f, size), Keyring.public_key(sender_address))
+    except Exception as e:
+        logger.debug(f"exception in decryption: {e}")
+        return None
+
+
+def _read_hex_file(f, file_size: int) -> bytearray:
+    """Decodes the hex content of the file chunk by chunk into a preallocated buffer and returns the buffer itself."""
+    buffer = bytearray(file_size // 2)
+    view = memoryview(buffer)
+    position = 0
+    carry = b""
+    prefix_checked = False
+    while True:
+        chunk = f.read(HEX_CHUNK_SIZE)
+        if not chunk:
+            break
+        chunk = carry + chunk.translate(None, b" \t\r\n")
+        if not prefix_checked and len(chunk) >= 2:
+            if chunk[:2] == b"0x":
+                chunk = chunk[2:]
+            prefix_checked = True
+        even_length = len(chunk) - len(chunk) % 2
+        carry = chunk[even_length:]
+        decoded = binascii.a2b_hex(chunk[:even_length])
+        view[position:position + len(decoded)] = decoded
+        position += len(decoded)
+    if carry:
+        raise ValueError("Odd-length hex content")
+    view.release()
+    del buffer[position:]
+    return buffer
+
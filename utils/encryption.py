@@ -3,11 +3,10 @@ import os
 import typing as tp
 
 from dotenv import load_dotenv
-from robonomicsinterface import Account
-from substrateinterface import Keypair, KeypairType
+
+from utils.keyring import Keyring
 
 load_dotenv()
-ADMIN_SEED = os.getenv("ADMIN_SEED")
 
 def encrypt_message(
     message: tp.Union[bytes, str],
@@ -22,8 +21,5 @@ def encrypt_message(
 
     :return: encrypted message
     """
-    account = Account(ADMIN_SEED, crypto_type=KeypairType.ED25519)
-    sender_keypair = account.keypair
-    recipient_kp = Keypair(ss58_address=address)
-    encrypted = sender_keypair.encrypt_message(message, recipient_kp.public_key)
+    encrypted = Keyring.encrypt(message, Keyring.public_key(address))
     return f"0x{encrypted.hex()}"
\ No newline at end of file
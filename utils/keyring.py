@@ -0,0 +1,145 @@
+import hashlib
+import os
+import threading
+import typing as tp
+from collections import OrderedDict
+
+import nacl.bindings
+import nacl.exceptions
+import nacl.public
+from nacl._sodium import ffi, lib
+from dotenv import load_dotenv
+from robonomicsinterface import Account
+from substrateinterface import Keypair, KeypairType
+
+load_dotenv()
+ADMIN_SEED = os.getenv("ADMIN_SEED")
+KEYRING_CACHE_SIZE = int(os.getenv("KEYRING_CACHE_SIZE") or 4096)
+
+
+class Keyring:
+    """Process-wide cache of the keys used for encryption between the admin account and the peers.
+    The admin account is derived from the seed once, the peers' public keys and the box shared secrets
+    are kept in bounded LRU caches.
+    """
+
+    _lock = threading.RLock()
+    _admin_account: tp.Optional[Account] = None
+    _public_keys: "OrderedDict[str, bytes]" = OrderedDict()
+    _keypairs: "OrderedDict[str, Keypair]" = OrderedDict()
+    _boxes: "OrderedDict[tp.Tuple[bytes, bytes], nacl.public.Box]" = OrderedDict()
+
+    @classmethod
+    def admin_account(cls) -> Account:
+        with cls._lock:
+            if cls._admin_account is None:
+                cls._admin_account = Account(ADMIN_SEED, crypto_type=KeypairType.ED25519)
+            return cls._admin_account
+
+    @classmethod
+    def admin_address(cls) -> str:
+        return cls.admin_account().get_address()
+
+    @classmethod
+    def public_key(cls, address: str) -> bytes:
+        """Returns the public key of the ss58 address."""
+        with cls._lock:
+            public_key = cls._get(cls._public_keys, address)
+        if public_key is None:
+            public_key = Keypair(ss58_address=address).public_key
+            with cls._lock:
+                cls._put(cls._public_keys, address, public_key)
+        return public_key
+
+    @classmethod
+    def keypair_from_seed(cls, seed: str) -> Keypair:
+        """Returns the ED25519 keypair of the seed, e.g. of the device seed. Seeds are kept only as sha256 in the cache."""
+        key = hashlib.sha256(seed.encode("utf-8")).hexdigest()
+        with cls._lock:
+            keypair = cls._get(cls._keypairs, key)
+        if keypair is None:
+            keypair = Account(seed, crypto_type=KeypairType.ED25519).keypair
+            with cls._lock:
+                cls._put(cls._keypairs, key, keypair)
+        return keypair
+
+    @classmethod
+    def decrypt(cls, encrypted_message: bytes, sender_public_key: bytes, keypair: tp.Optional[Keypair] = None) -> bytes:
+        """Decrypts the message like `Keypair.decrypt_message` with the cached shared secret.
+        :param encrypted_message: Message with the nonce
+        :param sender_public_key: Sender's ED25519 public key
+        :param keypair: Recipient's keypair. The admin keypair if None.
+
+        :return: Decrypted message
+        """
+        return cls._box(keypair or cls.admin_account().keypair, sender_public_key).decrypt(encrypted_message)
+
+    @classmethod
+    def decrypt_in_place(cls, buffer: bytearray, sender_public_key: bytes, keypair: tp.Optional[Keypair] = None) -> bytearray:
+        """Decrypts the message like `decrypt`, but libsodium writes the plaintext over the message in the buffer,
+        so the big messages are not copied. The buffer is truncated to the decrypted message.
+        :param buffer: Message with the nonce
+        :param sender_public_key: Sender's ED25519 public key
+        :param keypair: Recipient's keypair. The admin keypair if None.
+
+        :return: The same buffer with the decrypted message
+        """
+        box = cls._box(keypair or cls.admin_account().keypair, sender_public_key)
+        nonce_size = nacl.public.Box.NONCE_SIZE
+        mac_size = lib.crypto_box_macbytes()
+        ciphertext_size = len(buffer) - nonce_size
+        if ciphertext_size < mac_size:
+            raise nacl.exceptions.CryptoError("Message is too short")
+        nonce = bytes(buffer[:nonce_size])
+        with ffi.from_buffer("unsigned char[]", buffer, require_writable=True) as pointer:
+            result = lib.crypto_box_open_easy_afternm(pointer, pointer + nonce_size, ciphertext_size, nonce, box.shared_key())
+        if result != 0:
+            raise nacl.exceptions.CryptoError("An error occurred trying to decrypt the message")
+        del buffer[ciphertext_size - mac_size:]
+        return buffer
+
+    @classmethod
+    def encrypt(cls, message: tp.Union[bytes, str], recipient_public_key: bytes) -> bytes:
+        """Encrypts the message from the admin account like `Keypair.encrypt_message` with the cached shared secret
+        and a random nonce.
+
+        :return: Encrypted message with the nonce
+        """
+        box = cls._box(cls.admin_account().keypair, recipient_public_key)
+        return bytes(box.encrypt(message if isinstance(message, bytes) else message.encode("utf-8")))
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._admin_account = None
+            cls._public_keys.clear()
+            cls._keypairs.clear()
+            cls._boxes.clear()
+
+    @classmethod
+    def _box(cls, keypair: Keypair, peer_public_key: bytes) -> nacl.public.Box:
+        """Box with the precomputed shared secret of the keypair and the peer."""
+        key = (keypair.public_key, peer_public_key)
+        with cls._lock:
+            box = cls._get(cls._boxes, key)
+        if box is None:
+            private_key = nacl.bindings.crypto_sign_ed25519_sk_to_curve25519(keypair.private_key + keypair.public_key)
+            public_key = nacl.bindings.crypto_sign_ed25519_pk_to_curve25519(peer_public_key)
+            box = nacl.public.Box(nacl.public.PrivateKey(private_key), nacl.public.PublicKey(public_key))
+            with cls._lock:
+                cls._put(cls._boxes, key, box)
+        return box
+
+    @staticmethod
+    def _get(cache: OrderedDict, key: tp.Hashable) -> tp.Any:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _put(cache: OrderedDict, key: tp.Hashable, value: tp.Any) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > KEYRING_CACHE_SIZE:
+            cache.popitem(last=False)